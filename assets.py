@@ -0,0 +1,37 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image
+
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@lru_cache(maxsize=16)
+def _resized_png(path, target_width, mtime):
+    # mtime is only part of the cache key, so replacing the file on disk
+    # produces a new entry instead of the stale one
+    with Image.open(path) as image:
+        # If the image is not in RGBA/RGB format, convert it
+        if image.mode not in ('RGBA', 'RGB'):
+            image = image.convert('RGBA')
+
+        # Calculate the display size while maintaining aspect ratio
+        aspect_ratio = image.height / image.width
+        target_height = int(target_width * aspect_ratio)
+
+        # Resize using high-quality resampling
+        image = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def logo_png(filename, target_width):
+    # PNG bytes of an image next to this file, resized to target_width. The
+    # result is cached for the whole process, so the resize and encode happen
+    # once rather than on every rerun of every session.
+    path = os.path.join(ASSET_DIR, filename)
+    return _resized_png(path, target_width, os.path.getmtime(path))
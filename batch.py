@@ -0,0 +1,99 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from rules import DEFAULT_RULES
+from scoring import (IncrementalScorer, PointsTable, concat_results, find_top_performers, normalize_guesses,
+                     read_guesses_csv)
+
+
+def count_rows(path):
+    # Data rows in a CSV file (every line after the header)
+    lines, last = 0, b""
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            lines += block.count(b"\n")
+            last = block[-1:]
+        if last not in (b"", b"\n"):
+            lines += 1
+    return max(lines - 1, 0)
+
+
+def event_names(paths):
+    # Event name of each file: the file name without its extension, or the
+    # path relative to the files' common directory where files in different
+    # directories share a name, so they never merge into one event
+    names = {path: os.path.splitext(os.path.basename(path))[0] for path in paths}
+    counts = Counter(names.values())
+    clashing = [path for path in paths if counts[names[path]] > 1]
+    if clashing:
+        common = os.path.commonpath([os.path.abspath(path) for path in clashing])
+        for path in clashing:
+            names[path] = os.path.splitext(os.path.relpath(os.path.abspath(path), common))[0]
+    return names
+
+
+def plan_shards(paths, shard_rows=None):
+    # (path, first row, row count) for every shard. Without shard_rows each
+    # file is one shard; otherwise files are split into row ranges.
+    shards = []
+    for path in paths:
+        if not shard_rows:
+            shards.append((path, 0, None))
+            continue
+        rows = count_rows(path)
+        for start in range(0, max(rows, 1), shard_rows):
+            shards.append((path, start, shard_rows))
+    return shards
+
+
+def score_shard(shard, correct_answers, event_column=None, rules=DEFAULT_RULES, names=None):
+    # Runs in a worker process. Returns (event, detailed results, points table)
+    # for every event found in the shard. Without an event column the event
+    # is the file's name in names (see event_names).
+    path, start, nrows = shard
+    guesses_df = read_guesses_csv(path, rules, skiprows=range(1, start + 1), nrows=nrows)
+    if event_column:
+        parts = [(str(event), part) for event, part in guesses_df.groupby(event_column, sort=True, dropna=False)]
+    else:
+        parts = [((names or event_names([path]))[path], guesses_df)]
+
+    scored = []
+    for event, part in parts:
+        scorer = IncrementalScorer(normalize_guesses(part.reset_index(drop=True), rules), rules)
+        scorer.update(correct_answers)
+        scored.append((event, scorer.results, scorer.points_table()))
+    return scored
+
+
+def score_batch(paths, correct_answers, workers=1, event_column=None, shard_rows=None, rules=DEFAULT_RULES):
+    # Score many guesses files, or one file split by event or by rows, across a
+    # process pool. Returns {event: (detailed_results_df, correct_summary,
+    # top_scorers_dict)} ordered by event name. Shards are merged in the order
+    # they were planned, so the output doesn't depend on the worker count.
+    # Without an event column each file is an event named by event_names.
+    # Slots and prizes follow rules.
+    shards = plan_shards(paths, shard_rows)
+    score = partial(score_shard, correct_answers=correct_answers, event_column=event_column, rules=rules,
+                    names=event_names(paths))
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(score, shards))
+    else:
+        outputs = [score(shard) for shard in shards]
+
+    pieces = {}
+    for shard_output in outputs:
+        for event, results, table in shard_output:
+            pieces.setdefault(event, []).append((results, table))
+
+    events = {}
+    for event in sorted(pieces):
+        results = [piece[0] for piece in pieces[event]]
+        tables = [piece[1] for piece in pieces[event]]
+        table = tables[0] if len(tables) == 1 else PointsTable.merge(tables)
+        detailed_results_df = concat_results(results)
+        events[event] = (detailed_results_df, table.summary(),
+                         find_top_performers(table, categories=rules.prize_categories))
+    return events
@@ -0,0 +1,40 @@
+"""Rows per second of batch scoring with 1, 2, 4 and 8 worker processes.
+
+    python -m benchmarks.bench_batch --rows 400000 --shards 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from batch import score_batch
+from benchmarks.synthetic import make_answers, make_guesses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=400_000)
+    parser.add_argument("--shards", type=int, default=16, help="row shards the file is split into")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    answers = make_answers()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "guesses.csv")
+        make_guesses(args.rows).to_csv(path, index=False)
+        shard_rows = -(-args.rows // args.shards)
+
+        print(f"{os.cpu_count()} CPUs, {args.rows} rows in {args.shards} shards")
+        print(f"{'workers':>7} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            score_batch([path], answers, workers=workers, shard_rows=shard_rows)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>7} {elapsed:>8.2f} {args.rows / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
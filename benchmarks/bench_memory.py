@@ -0,0 +1,32 @@
+"""Memory of the compact results frame against the string-column layout the
+app used before (the same frame passed through render_results).
+
+    python -m benchmarks.bench_memory --sizes 10000 100000
+"""
+
+import argparse
+
+from benchmarks.synthetic import make_answers, make_guesses
+from scoring import analyze_guesses, render_results
+
+
+def frame_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    answers = make_answers()
+    print(f"{'participants':>12} {'rows':>9} {'strings MB':>11} {'compact MB':>11} {'ratio':>6}")
+    for size in args.sizes:
+        compact = analyze_guesses(make_guesses(size), answers)
+        strings = render_results(compact)
+        legacy_mb, compact_mb = frame_mb(strings), frame_mb(compact)
+        print(f"{size:>12} {len(compact):>9} {legacy_mb:>11.1f} {compact_mb:>11.1f} {legacy_mb / compact_mb:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
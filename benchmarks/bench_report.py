@@ -0,0 +1,40 @@
+"""Peak Python memory and run time of create_pdf as the participant count grows.
+
+    python -m benchmarks.bench_report --sizes 1000 5000 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_answers, make_guesses
+from report import create_pdf
+from scoring import IncrementalScorer, normalize_guesses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--summary-only", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'rows':>9} {'seconds':>8} {'report MB':>10} {'peak MB':>8}")
+    for size in args.sizes:
+        scorer = IncrementalScorer(normalize_guesses(make_guesses(size)))
+        scorer.update(make_answers())
+        results, summary = scorer.results, scorer.summary()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        report = create_pdf(results, summary, {}, {}, include_details=not args.summary_only)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report.seek(0, 2)
+        print(f"{size:>12} {len(results):>9} {elapsed:>8.2f} {report.tell() / 1e6:>10.2f} {peak / 1e6:>8.2f}")
+        report.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Compare the vectorized analyze_guesses against the original row-by-row
+implementation on synthetic guesses files, with every answer entered and with
+a partly entered event.
+
+The engine differs from the original on purpose in one way: a place whose
+answer hasn't been entered ("0") never counts as correct, where the original
+counted every "0" (no guess) guess for that place as right. The oracle's output is brought
+in line with that rule before comparing (see apply_no_answer_rule), and the
+number of rows the rule changes is printed, so everything else is still
+checked exactly.
+
+    python -m benchmarks.bench_scoring --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_answers, make_guesses
+from scoring import NO_GUESS_VALUES, PLACES, analyze_guesses, render_results
+
+
+# Answers entered so far partway through an event: one place of one race,
+# two places of another and one OPT slot
+PARTIAL_COLUMNS = ("Race2_1st", "Race3_1st", "Race3_3rd", "OPT3")
+
+
+def reference_analyze_guesses(guesses_df, correct_answers):
+    # The iterrows implementation from draft5.py, kept verbatim as the oracle.
+    detailed_results = []
+
+    for _, row in guesses_df.iterrows():
+        participant_name = row["Name"]
+        for race_num in range(2, 8):
+            actual_1st = str(correct_answers.get(f"Race{race_num}_1st", "0")).strip()
+            actual_2nd = str(correct_answers.get(f"Race{race_num}_2nd", "0")).strip()
+            actual_3rd = str(correct_answers.get(f"Race{race_num}_3rd", "0")).strip()
+
+            if actual_1st == "0" and actual_2nd == "0" and actual_3rd == "0":
+                continue
+
+            participant_1st = str(row.get(f"Race{race_num}_1st", "0")).strip()
+            participant_2nd = str(row.get(f"Race{race_num}_2nd", "0")).strip()
+            participant_3rd = str(row.get(f"Race{race_num}_3rd", "0")).strip()
+
+            points = 0
+            if participant_1st == actual_1st:
+                points += 12
+            if participant_2nd == actual_2nd:
+                points += 6
+            if participant_3rd == actual_3rd:
+                points += 2
+
+            detailed_results.append({
+                "Name": participant_name,
+                "Race": f"Race {race_num}",
+                "1st Place Guess": participant_1st,
+                "1st Place Actual": actual_1st,
+                "1st Place Correct": participant_1st == actual_1st,
+                "2nd Place Guess": participant_2nd,
+                "2nd Place Actual": actual_2nd,
+                "2nd Place Correct": participant_2nd == actual_2nd,
+                "3rd Place Guess": participant_3rd,
+                "3rd Place Actual": actual_3rd,
+                "3rd Place Correct": participant_3rd == actual_3rd,
+                "Points": points
+            })
+
+        opt_actual = [str(correct_answers.get(f"OPT{i}", "0")).strip() for i in range(2, 8)]
+        if any(value != "0" for value in opt_actual):
+            participant_opt_guesses = [str(row.get(f"OPT{i}", "0")).strip() for i in range(2, 8)]
+            for idx, opt_num in enumerate(range(2, 8)):
+                actual = opt_actual[idx]
+                guess = participant_opt_guesses[idx]
+                if actual == "0":
+                    continue
+                is_correct = guess == actual
+                points = 1 if is_correct else 0
+                detailed_results.append({
+                    "Name": participant_name,
+                    "Race": f"OPT{opt_num}",
+                    "1st Place Guess": guess,
+                    "1st Place Actual": actual,
+                    "1st Place Correct": is_correct,
+                    "2nd Place Guess": "",
+                    "2nd Place Actual": "",
+                    "2nd Place Correct": False,
+                    "3rd Place Guess": "",
+                    "3rd Place Actual": "",
+                    "3rd Place Correct": False,
+                    "Points": points
+                })
+
+    return pd.DataFrame(detailed_results)
+
+
+def apply_no_answer_rule(reference_df):
+    # The oracle's output with places whose answer isn't entered never
+    # correct, and the points recomputed from the corrected flags
+    adjusted = reference_df.copy()
+    is_opt = adjusted["Race"].str.startswith("OPT").to_numpy()
+    points = np.zeros(len(adjusted), dtype=np.int64)
+    for place, weight in zip(PLACES, (12, 6, 2)):
+        correct = adjusted[f"{place} Place Correct"] & ~adjusted[f"{place} Place Actual"].isin(NO_GUESS_VALUES)
+        adjusted[f"{place} Place Correct"] = correct
+        points += correct.to_numpy() * np.where(is_opt, 1 if place == "1st" else 0, weight)
+    adjusted["Points"] = points
+    return adjusted
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-reference-above", type=int, default=None,
+                        help="only time the vectorized engine for sizes above this")
+    args = parser.parse_args()
+
+    full = make_answers()
+    cases = {"full": full, "partial": {column: full[column] for column in PARTIAL_COLUMNS}}
+    print(f"{'rows':>10} {'answers':>8} {'reference s':>12} {'vectorized s':>13} {'speedup':>8}  match  "
+          f"{'rule rows':>9}")
+    for size in args.sizes:
+        guesses_df = make_guesses(size)
+        for case, answers in cases.items():
+            fast, fast_time = timed(analyze_guesses, guesses_df, answers)
+            if args.skip_reference_above is not None and size > args.skip_reference_above:
+                print(f"{size:>10} {case:>8} {'-':>12} {fast_time:>13.3f} {'-':>8}  -")
+                continue
+            slow, slow_time = timed(reference_analyze_guesses, guesses_df, answers)
+            expected = apply_no_answer_rule(slow)
+            # Rows whose points the no-answer rule changes
+            changed = int((expected["Points"] != slow["Points"]).sum())
+            # The engine returns compact dtypes; compare the rendered values
+            pd.testing.assert_frame_equal(render_results(fast), expected, check_dtype=False)
+            print(f"{size:>10} {case:>8} {slow_time:>12.3f} {fast_time:>13.3f} {slow_time / fast_time:>7.1f}x  yes  "
+                  f"{changed:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Time every stage of scoring an event at fixed sizes and save the timings as
+JSON, so runs from different commits can be compared.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 1000 10000 --repeats 3 --out before.json
+    python -m benchmarks.suite --compare before.json
+
+Stages: parsing the CSV (read_guesses), analyze_guesses, the per-participant
+summary, the prize categories (find_top_performers) and create_pdf with and
+without the detail table. Guesses come from benchmarks.synthetic with fixed
+seeds, so the same arguments always time the same data.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_answers, make_guesses
+from report import create_pdf
+from scoring import IncrementalScorer, PointsTable, analyze_guesses, find_top_performers, read_guesses
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_case(func, setup, repeats):
+    # setup() builds fresh arguments for every repeat and is not timed, so
+    # caches filled by one repeat can't speed up the next
+    timings = []
+    for _ in range(repeats):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def scored(normalized_df, answers):
+    scorer = IncrementalScorer(normalized_df)
+    scorer.update(answers)
+    return scorer
+
+
+def write_pdf(*args, **kwargs):
+    create_pdf(*args, **kwargs).close()
+
+
+def cases(size, args):
+    # (name, func, setup) for one participant count
+    guesses_df = make_guesses(size, field_size=args.field_size, blank_rate=args.blank_rate,
+                              duplicate_rate=args.duplicate_rate, favourite_skew=args.favourite_skew)
+    answers = make_answers(args.field_size)
+    csv_bytes = guesses_df.to_csv(index=False).encode()
+    normalized_df = read_guesses(io.BytesIO(csv_bytes))
+    scorer = scored(normalized_df, answers)
+    table = scorer.points_table()
+    results, summary = scorer.results, scorer.summary()
+    top_scorers = find_top_performers(table)
+
+    yield "read_guesses", read_guesses, lambda: (io.BytesIO(csv_bytes),)
+    yield "analyze_guesses", analyze_guesses, lambda: (guesses_df, answers)
+    yield "summary", lambda s: s.points_table().summary(), lambda: (scored(normalized_df, answers),)
+    yield "prizes", find_top_performers, lambda: (PointsTable(table.frame, table.labels),)
+    if size <= args.pdf_max:
+        yield "pdf_summary", lambda: write_pdf(results, summary, top_scorers, {}, include_details=False), tuple
+        yield "pdf_detailed", lambda: write_pdf(results, summary, top_scorers, {}), tuple
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(case["case"], case["participants"]): case for case in json.load(f)["results"]}
+    print(f"\ncompared with {baseline_path}")
+    print(f"{'case':<16} {'participants':>12} {'before s':>9} {'after s':>9} {'change':>8}")
+    for case in results:
+        before = baseline.get((case["case"], case["participants"]))
+        if before is None:
+            continue
+        change = case["median_s"] / before["median_s"] - 1
+        print(f"{case['case']:<16} {case['participants']:>12} {before['median_s']:>9.4f} "
+              f"{case['median_s']:>9.4f} {change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="participant counts to time")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--pdf-max", type=int, default=10_000,
+                        help="skip the PDF cases above this many participants")
+    parser.add_argument("--field-size", type=int, default=14)
+    parser.add_argument("--blank-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--favourite-skew", type=float, default=1.0)
+    parser.add_argument("--out", help="JSON file to write (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<16} {'participants':>12} {'best s':>9} {'median s':>9}")
+    for size in args.sizes:
+        for name, func, setup in cases(size, args):
+            timings = time_case(func, setup, args.repeats)
+            results.append({"case": name, "participants": size, "repeats": args.repeats,
+                            "best_s": round(min(timings), 6), "median_s": round(statistics.median(timings), 6)})
+            print(f"{name:<16} {size:>12} {min(timings):>9.4f} {statistics.median(timings):>9.4f}")
+
+    commit = git_commit()
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "results": results,
+    }
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Synthetic guesses files in the layout the app reads: Name, Race2_1st ...
+Race7_3rd, OPT2 ... OPT7.
+
+    python -m benchmarks.synthetic guesses.csv --participants 10000 --duplicate-rate 0.01
+    python -m benchmarks.synthetic guesses.csv --participants 500 --answers answers.json
+
+The same arguments and seed always produce the same file.
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from scoring import GUESS_COLUMNS, OPT_COLUMNS, PLACES, RACE_NUMBERS
+
+
+def _pick_weights(field_size, favourite_skew):
+    # Punters favour the shorter-priced horses: horse n is picked with weight
+    # 1 / n ** favourite_skew (0 for a uniform pick)
+    weights = 1.0 / np.arange(1, field_size + 1) ** favourite_skew
+    return weights / weights.sum()
+
+
+def _podium(rng, rows, field_size, weights):
+    # Three distinct horses per row, drawn by weight: sort weighted random
+    # keys (Efraimidis-Spirakis) and keep the top three
+    keys = rng.random((rows, field_size)) ** (1 / weights)
+    return np.argsort(-keys, axis=1)[:, :len(PLACES)] + 1
+
+
+def make_guesses(rows, field_size=14, blank_rate=0.05, duplicate_rate=0.0, favourite_skew=0.0, seed=0):
+    # blank_rate is the share of guesses left as 0 (no guess) and
+    # duplicate_rate the share of rows that reuse an earlier participant's
+    # name. Each race's guesses are three different horses, picked uniformly
+    # over the field unless favourite_skew is set.
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Participant {i}" for i in range(rows)], dtype=object)
+    if duplicate_rate:
+        duplicates = np.flatnonzero(rng.random(rows) < duplicate_rate)
+        duplicates = duplicates[duplicates > 0]
+        names[duplicates] = names[rng.integers(0, duplicates)]
+
+    columns = {}
+    weights = _pick_weights(field_size, favourite_skew)
+    for race_num in RACE_NUMBERS:
+        podium = _podium(rng, rows, field_size, weights)
+        for index, place in enumerate(PLACES):
+            columns[f"Race{race_num}_{place}"] = podium[:, index]
+    for column in OPT_COLUMNS:
+        columns[column] = rng.choice(field_size, size=rows, p=weights) + 1
+
+    data = {"Name": names}
+    for column in GUESS_COLUMNS:
+        values = columns[column]
+        values[rng.random(rows) < blank_rate] = 0
+        data[column] = values
+    return pd.DataFrame(data)
+
+
+def make_answers(field_size=14, seed=1):
+    # Every race finishes with three different horses
+    rng = np.random.default_rng(seed)
+    answers = {}
+    uniform = _pick_weights(field_size, 0)
+    for race_num in RACE_NUMBERS:
+        podium = _podium(rng, 1, field_size, uniform)[0]
+        for index, place in enumerate(PLACES):
+            answers[f"Race{race_num}_{place}"] = str(podium[index])
+    for column in OPT_COLUMNS:
+        answers[column] = str(rng.integers(1, field_size + 1))
+    return answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="guesses CSV to write")
+    parser.add_argument("--participants", type=int, default=1_000)
+    parser.add_argument("--field-size", type=int, default=14, help="horses per race (default: 14)")
+    parser.add_argument("--blank-rate", type=float, default=0.05, help="share of guesses left blank")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="share of rows reusing an earlier name")
+    parser.add_argument("--favourite-skew", type=float, default=0.0,
+                        help="bias picks towards low horse numbers (0 is uniform, 1 is a realistic skew)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--answers", help="also write matching correct answers to this JSON file")
+    args = parser.parse_args()
+
+    make_guesses(args.participants, field_size=args.field_size, blank_rate=args.blank_rate,
+                 duplicate_rate=args.duplicate_rate, favourite_skew=args.favourite_skew,
+                 seed=args.seed).to_csv(args.out, index=False)
+    if args.answers:
+        with open(args.answers, "w") as f:
+            json.dump(make_answers(args.field_size, seed=args.seed + 1), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
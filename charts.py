@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8)
+def _gauge_template(max_points):
+    # plotly is only imported once a gauge is shown
+    import plotly.graph_objects as go
+
+    return go.Figure(go.Indicator(
+        mode="number+gauge",
+        value=0,
+        title={"text": "Total Points"},
+        gauge={"axis": {"range": [0, max_points]}},
+    ))
+
+
+@lru_cache(maxsize=512)
+def points_gauge(value, max_points):
+    # Totals are small integers, so each gauge is built once per process from
+    # the template and reused by every session that selects that total.
+    # Callers must not modify the returned figure.
+    import plotly.graph_objects as go
+
+    figure = go.Figure(_gauge_template(max_points))
+    figure.data[0].value = value
+    return figure
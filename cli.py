@@ -0,0 +1,166 @@
+"""Score guesses files from the command line, without starting the Streamlit app.
+
+    python cli.py guesses.csv --answers answers.json --out results --format csv pdf
+    python cli.py 'uploads/*.csv' --answers answers.csv --format parquet --workers 4
+    python cli.py all_clubs.csv --answers answers.json --event-column Club --workers 8
+    python cli.py huge.csv --answers answers.json --format parquet --chunk-rows 200000
+    python cli.py guesses.csv --answers answers.json --rules derby_rules.json
+
+Each event writes <event>_detailed and <event>_summary tables in every
+requested table format, plus <event>_report.pdf when pdf is requested.
+Without --event-column every guesses file is one event named after the file;
+files with the same name in different directories are named by their path
+from the directory they share (club_a/guesses.csv -> club_a_guesses).
+
+With --chunk-rows each file is read, scored and written a chunk at a time, so
+files larger than memory can be scored. Only the per-participant totals stay
+in memory; the PDF report then contains the summary and winners only.
+
+--rules takes a JSON scoring rules file (see rules.py) for meetings with other
+races, points or prizes than the default.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+from batch import count_rows, event_names, score_batch
+from rules import load_rules
+from scoring import active_slots, find_top_performers, read_answers, render_results
+from streaming import score_csv_in_chunks
+
+
+FORMATS = ("csv", "parquet", "pdf")
+
+
+def expand_paths(paths):
+    # Accept files, directories (every .csv inside) and glob patterns. A file
+    # matched more than once is only scored once.
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        elif glob.has_magic(path):
+            expanded.extend(sorted(glob.glob(path)))
+        else:
+            expanded.append(path)
+    unique = {}
+    for path in expanded:
+        unique.setdefault(os.path.realpath(path), path)
+    return list(unique.values())
+
+
+def write_outputs(out_dir, stem, formats, detailed_results_df, correct_summary, top_scorers_dict, summary_only=False):
+    # detailed_results_df is None when the detail tables were already
+    # streamed to disk
+    written = []
+    tables = [("summary", correct_summary)] if detailed_results_df is None else \
+        [("detailed", detailed_results_df), ("summary", correct_summary)]
+    for table, frame in tables:
+        if "csv" in formats:
+            written.append(os.path.join(out_dir, f"{stem}_{table}.csv"))
+            (render_results(frame) if table == "detailed" else frame).to_csv(written[-1], index=False)
+        # Parquet keeps the compact categorical columns
+        if "parquet" in formats:
+            written.append(os.path.join(out_dir, f"{stem}_{table}.parquet"))
+            frame.to_parquet(written[-1], index=False)
+    if "pdf" in formats:
+        # reportlab is only imported when a report is requested
+        from report import create_pdf
+
+        written.append(os.path.join(out_dir, f"{stem}_report.pdf"))
+        with create_pdf(detailed_results_df, correct_summary, top_scorers_dict, {},
+                        include_details=not summary_only and detailed_results_df is not None) as report, open(written[-1], "wb") as f:
+            while chunk := report.read(1024 * 1024):
+                f.write(chunk)
+    return written
+
+
+def score_in_chunks(path, out_dir, stem, formats, correct_answers, chunk_rows, rules):
+    # Stream one file, writing the detail tables as it goes and reporting
+    # progress on stderr
+    total = count_rows(path)
+    detail_csv = os.path.join(out_dir, f"{stem}_detailed.csv") if "csv" in formats else None
+    detail_parquet = os.path.join(out_dir, f"{stem}_detailed.parquet") if "parquet" in formats else None
+
+    def progress(rows):
+        print(f"\r{path}: {rows}/{total} rows ({rows / max(total, 1):.0%})", end="", file=sys.stderr, flush=True)
+
+    table, _ = score_csv_in_chunks(path, correct_answers, chunk_rows=chunk_rows,
+                                   detail_csv=detail_csv, detail_parquet=detail_parquet, progress=progress,
+                                   rules=rules)
+    print(file=sys.stderr)
+    return table, [output for output in (detail_csv, detail_parquet) if output]
+
+
+def report_event(event, correct_summary, top_scorers_dict, written):
+    print(f"{event}: {len(correct_summary)} participants")
+    for category, names in top_scorers_dict.items():
+        print(f"  {category}: {', '.join(map(str, names))}")
+    for output in written:
+        print(f"  wrote {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score race guesses files without the Streamlit app.")
+    parser.add_argument("guesses", nargs="+", help="guesses CSV files, directories or glob patterns")
+    parser.add_argument("--answers", required=True, help="correct answers as a JSON or CSV file")
+    parser.add_argument("--rules", help="scoring rules as a JSON file (default: the built-in rules)")
+    parser.add_argument("--out", default=".", help="output directory (default: current directory)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["csv"], dest="formats",
+                        help="output formats (default: csv)")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="leave the per-race detail table out of the PDF report")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument("--event-column", help="column that splits a guesses file into separate events")
+    parser.add_argument("--shard-rows", type=int,
+                        help="split each file into shards of this many rows for the worker pool")
+    parser.add_argument("--chunk-rows", type=int,
+                        help="stream each file in chunks of this many rows instead of loading it whole")
+    args = parser.parse_args(argv)
+    if args.chunk_rows and (args.workers > 1 or args.event_column or args.shard_rows):
+        parser.error("--chunk-rows can't be combined with --workers, --event-column or --shard-rows")
+
+    paths = expand_paths(args.guesses)
+    if not paths:
+        parser.error("no guesses files found")
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(f"can't use the rules file: {e}")
+    correct_answers = read_answers(args.answers, rules)
+    if not active_slots(correct_answers, rules):
+        parser.error("no valid race results in the answers file; enter at least one non-zero value")
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.chunk_rows:
+        names = event_names(paths)
+        for path in paths:
+            stem = names[path].replace(os.sep, "_")
+            try:
+                table, written = score_in_chunks(path, args.out, stem, args.formats, correct_answers, args.chunk_rows,
+                                                 rules)
+                correct_summary = table.summary()
+                top_scorers_dict = find_top_performers(table, categories=rules.prize_categories)
+                written += write_outputs(args.out, stem, args.formats, None, correct_summary, top_scorers_dict)
+            except ImportError as e:
+                sys.exit(f"Parquet output needs pyarrow installed: {e}")
+            report_event(path, correct_summary, top_scorers_dict, written)
+        return
+
+    events = score_batch(paths, correct_answers, workers=args.workers,
+                         event_column=args.event_column, shard_rows=args.shard_rows, rules=rules)
+    for event, (detailed_results_df, correct_summary, top_scorers_dict) in events.items():
+        stem = event.replace(os.sep, "_")
+        try:
+            written = write_outputs(args.out, stem, args.formats, detailed_results_df, correct_summary,
+                                    top_scorers_dict, args.summary_only)
+        except ImportError as e:
+            sys.exit(f"Parquet output needs pyarrow or fastparquet installed: {e}")
+        report_event(event, correct_summary, top_scorers_dict, written)
+
+
+if __name__ == "__main__":
+    main()
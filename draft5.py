@@ -1,164 +1,320 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import random  # For lucky draw
-from PIL import Image  # For image handling
 import os
+import random  # For lucky draw
+import time
+
+from assets import logo_png
+from cache import LRUCache, content_hash, frame_nbytes
+from charts import points_gauge
+from jobs import JobQueue
+from live import LiveEvent
+from participants import ParticipantIndex
+from profiling import DEBUG_ENV, PROFILE_ENV, RerunProfiler, RerunTimer, configure_logging, env_flag
+from rules import DEFAULT_RULES, load_rules
+from scoring import IncrementalScorer, active_slots, find_top_performers, render_results
+from store import ResultsStore
+from validation import report_messages, validate_guesses
+
+
+# Upper bound on the memory held by parsed guesses files across all sessions
+GUESSES_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Upper bound on the scored results shared between sessions
+RESULTS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+RESULTS_PAGE_SIZES = [25, 50, 100]
+LIVE_ANSWERS_PATH = "live/answers.json"
+LIVE_GUESSES_DIR = "live/guesses"
+LIVE_REFRESH_SECONDS = 5
+LIVE_LEADERBOARD_ROWS = 25
+LEADERBOARD_SIZES = [10, 25, 50, 100]
+# Background report builds, and the memory kept for finished reports
+REPORT_WORKERS = 2
+REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+REPORT_POLL_SECONDS = 1
+# Set RACE_RULES to a JSON scoring rules file (see rules.py) to score a
+# meeting with other races, points or prizes than the default
+RULES_ENV = "RACE_RULES"
+
+
+@st.cache_resource(max_entries=4)
+def get_rules(path, mtime_ns):
+    # Compiled once per version of the rules file
+    return load_rules(path)
+
+
+def current_rules():
+    path = os.environ.get(RULES_ENV)
+    if not path:
+        return DEFAULT_RULES
+    return get_rules(path, os.stat(path).st_mtime_ns)
+
+
+@st.cache_resource
+def get_guesses_cache():
+    # Entries are (normalized frame, validation report)
+    return LRUCache(GUESSES_CACHE_MAX_BYTES, sizeof=lambda entry: frame_nbytes(entry[0]))
+
+
+@st.cache_resource
+def get_store():
+    return ResultsStore()
+
+
+def load_guesses(uploaded_file):
+    # Parse, validate and normalize each distinct upload once. Reruns
+    # triggered by the answer inputs only hash the bytes already held by the
+    # uploader, and after a restart the parsed frame comes back from the
+    # results store. Returns (file hash, normalized frame, GuessesReport).
+    data = uploaded_file.getvalue()
+    file_hash = content_hash(data)
+
+    def parse():
+        store = get_store()
+        entry = store.load_guesses(file_hash, RULES.fingerprint)
+        if entry is None:
+            entry = validate_guesses(BytesIO(data), RULES)
+            store.save_event(file_hash, uploaded_file.name)
+            store.save_guesses(file_hash, RULES.fingerprint, *entry)
+        return entry
+
+    # Sessions uploading the same file at the same time share one parse
+    return (file_hash, *get_guesses_cache().get_or_compute((file_hash, RULES.fingerprint), parse))
+
+
+def show_guesses_report(report):
+    messages = report_messages(report)
+    if not messages:
+        return
+    st.warning("Problems found in the guesses file:\n\n" + "\n".join(f"- {message}" for message in messages))
+    with st.expander("Details"):
+        if report.bad_lines:
+            st.write("Skipped lines")
+            st.dataframe(pd.DataFrame(report.bad_lines, columns=["Line", "Reason"]), hide_index=True)
+        if report.short_lines:
+            st.write("Lines with too few fields")
+            st.dataframe(pd.DataFrame(report.short_lines, columns=["Line", "Reason"]), hide_index=True)
+        if report.blank_names:
+            st.write(f"Lines with no name: {', '.join(map(str, report.blank_names[:100]))}")
+        if len(report.invalid_guesses):
+            st.write("Guesses that aren't horse numbers")
+            st.dataframe(report.invalid_guesses, hide_index=True)
+        if len(report.duplicate_names):
+            st.write("Names on more than one row")
+            st.dataframe(report.duplicate_names, hide_index=True)
+
+
+def restore_event(file_hash):
+    # The first time a session sees an upload, bring back the answers and
+    # lucky draws saved for it by earlier sessions. Answers are only restored
+    # into inputs that are still at their default.
+    if st.session_state.get("restored_hash") == file_hash:
+        return
+    st.session_state.restored_hash = file_hash
+    store = get_store()
+    saved_answers = store.load_answers(file_hash)
+    if saved_answers and all(st.session_state[key] == "0" for key in ANSWER_INPUT_KEYS.values()):
+        for column, key in ANSWER_INPUT_KEYS.items():
+            st.session_state[key] = saved_answers.get(column, "0")
+    draws = store.load_lucky_draws(file_hash)
+    st.session_state.lucky_draw_winners.update(draws)
+    st.session_state.all_lucky_draw_winners.update(draws.values())
+
+
+@st.cache_resource(max_entries=8)
+def get_participant_index(file_hash, _guesses_df):
+    # Shared by every session that uploads the same file
+    return ParticipantIndex(_guesses_df["Name"])
+
+
+@st.cache_resource
+def get_results_cache():
+    return LRUCache(RESULTS_CACHE_MAX_BYTES, sizeof=lambda scorer: scorer.nbytes())
+
+
+def get_scorer(file_hash, guesses_df, correct_answers):
+    # The scored event for this upload and these answers, shared by every
+    # session: the first session to ask scores it while the others wait and
+    # reuse the result. It starts from a copy of this session's previous
+    # scorer, so only slots whose answers changed are scored or loaded from
+    # the results store. The returned scorer is shared and must not be
+    # updated.
+    slots = active_slots(correct_answers, RULES)
+    previous = st.session_state.get('scorer')
+    if st.session_state.get('scorer_hash') != file_hash or (previous and previous.rules != RULES):
+        previous = None
+
+    def score():
+        scorer = previous.copy() if previous else IncrementalScorer(guesses_df, RULES)
+        known = scorer.blocks
+        missing = [(label, answers) for label, answers in slots if known.get(label, (None,))[0] != answers]
+        store = get_store()
+        stored = store.load_blocks(file_hash, RULES.fingerprint, missing) if missing else {}
+        scorer.seed(stored)
+        scorer.update(correct_answers)
+        blocks = scorer.blocks
+        store.save_blocks(file_hash, RULES.fingerprint,
+                          {label: blocks[label] for label, _ in missing if label not in stored})
+        # Build everything the page reads while still single-flight
+        table = scorer.points_table()
+        table.ranked_summary()
+        for category in RULES.prize_categories:
+            # Ordered now so the cache is sized with the order included
+            _ = table.ranking(category).order
+        scorer.slot_accuracy()
+        _ = scorer.results  # assigned so Streamlit's magic doesn't display it
+        return scorer
+
+    scorer = get_results_cache().get_or_compute((file_hash, RULES.fingerprint, tuple(slots)), score)
+    st.session_state.scorer = scorer
+    st.session_state.scorer_hash = file_hash
+    return scorer
+
+
+def save_answers(file_hash, correct_answers):
+    if st.session_state.get("saved_answers") != (file_hash, correct_answers):
+        get_store().save_answers(file_hash, correct_answers)
+        st.session_state.saved_answers = (file_hash, correct_answers)
+
+
+def show_results_page(ranked_summary, detailed_results_df, participant_index, slots_per_participant):
+    # One page of per-participant totals, sorted server-side by points. Only
+    # the visible page is sent to the browser; selecting a row loads that
+    # participant's per-race rows.
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Rows per page", RESULTS_PAGE_SIZES, key="results_page_size")
+    pages = max(1, -(-len(ranked_summary) // page_size))
+    if st.session_state.get("results_page", 1) > pages:
+        st.session_state.results_page = 1
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="results_page")
+
+    page_df = ranked_summary.iloc[(page - 1) * page_size:page * page_size]
+    # Keyed per page, so a selection never carries over to another page
+    selection = st.dataframe(page_df, hide_index=True, on_select="rerun", selection_mode="single-row",
+                             key=f"results_table_{page_size}_{page}")
+    selected = [row for row in selection.selection.rows if row < len(page_df)]
+    if selected:
+        name = page_df.iloc[selected[0]]["Name"]
+        st.caption(f"Race by race results for {name}")
+        rows = participant_index.rows(name, slots_per_participant)
+        st.dataframe(render_results(detailed_results_df.iloc[rows]), hide_index=True)
+    else:
+        st.caption("Select a row to see that participant's race by race results.")
+
+
+@st.cache_resource
+def get_live_event(answers_path, guesses_dir, rules_fingerprint, _rules):
+    # One live event per pair of paths and rules, polled by every session
+    # showing it
+    return LiveEvent(answers_path, guesses_dir, _rules)
+
+
+def show_live_event(event, interval):
+    # Only this fragment reruns on the interval, not the whole script. Each
+    # run polls the files and applies whatever changed.
+    @st.fragment(run_every=interval)
+    def live_results():
+        # Rendered only from the snapshot, since other sessions poll the same
+        # event concurrently
+        snapshot = event.poll()
+        changes, table = snapshot.changes, snapshot.table
+        for path, error in snapshot.errors.items():
+            st.warning(f"Couldn't read {path}, keeping its last version: {error}")
+        if table is None:
+            st.info(f"Waiting for guesses files in {event.guesses_dir}")
+            return
+        updated = time.strftime("%H:%M:%S", time.localtime(snapshot.updated_at))
+        st.caption(f"{len(snapshot.files)} guesses files, {len(table.labels)} slots with results, "
+                   f"last change at {updated}" + (f": {', '.join(changes)}" if changes else ""))
+
+        st.subheader("Leaderboard")
+        st.dataframe(table.ranking().top(LIVE_LEADERBOARD_ROWS), hide_index=True)
 
+        st.subheader("Top Performers")
+        top_scorers_dict = find_top_performers(table, st.session_state.all_lucky_draw_winners,
+                                               event.rules.prize_categories)
+        if not top_scorers_dict:
+            st.write("No prize category has results yet.")
+        for category in event.rules.prize_categories:
+            if category.name in top_scorers_dict:
+                st.write(f"**{category.name}**: {', '.join(map(str, top_scorers_dict[category.name]))}")
 
-def analyze_guesses(guesses_df, correct_answers):
-    detailed_results = []
+    live_results()
 
-    for _, row in guesses_df.iterrows():
-        participant_name = row["Name"]
-        # Process races (Race2 to Race7)
-        for race_num in range(2, 8):
-            actual_1st = str(correct_answers.get(f"Race{race_num}_1st", "0")).strip()
-            actual_2nd = str(correct_answers.get(f"Race{race_num}_2nd", "0")).strip()
-            actual_3rd = str(correct_answers.get(f"Race{race_num}_3rd", "0")).strip()
 
-            if actual_1st == "0" and actual_2nd == "0" and actual_3rd == "0":
-                continue
+def show_leaderboard(ranking):
+    # Top-k by total points with shared ranks for ties, next to how many
+    # participants are on each score
+    col1, col2 = st.columns(2)
+    with col1:
+        k = st.selectbox("Show top", LEADERBOARD_SIZES, key="leaderboard_size")
+        st.dataframe(ranking.top(k), hide_index=True)
+    with col2:
+        leaders = ranking.tied_at_max()
+        st.caption(f"{len(ranking)} participants; {len(leaders)} tied on the top score of {ranking.max_score()}")
+        st.bar_chart(ranking.histogram(), x_label="Points", y_label="Participants")
+
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(REPORT_WORKERS, REPORT_CACHE_MAX_BYTES)
+
+
+def build_report(detailed_results_df, correct_summary, top_scorers_dict, lucky_draw_winners, include_details):
+    # Runs on the job queue; reportlab is only imported once a report is
+    # requested
+    from report import create_pdf
+
+    with RerunTimer(run="report").stage("pdf", rows=len(detailed_results_df)), create_pdf(
+        detailed_results_df, correct_summary, top_scorers_dict, lucky_draw_winners, include_details=include_details
+    ) as report:
+        return report.read()
+
+
+def build_slips(detailed_results_df, slots_per_participant):
+    from report import create_slips
+
+    with RerunTimer(run="report").stage("slips", rows=len(detailed_results_df)), create_slips(
+        detailed_results_df, slots_per_participant
+    ) as slips:
+        return slips.read()
+
+
+def show_artifact(jobs, key, label, file_name, build, *args):
+    # A build button, the build's progress while it runs on the job queue,
+    # then the download button once the PDF is ready. The queue forgets a
+    # build once it's done, so the session holds on to its own: a failure,
+    # or a PDF too large for the artifact cache, is shown from it once.
+    state_key = f"job_{file_name}"
+    own = st.session_state.pop(state_key, None)
+    job = jobs.job(key)
+    if job is None and own is not None and own[0] == key:
+        job = own[1]
+    if job is not None and job.done() and job.exception() is not None:
+        st.error(f"Building the {label} failed: {job.exception()}")
+        job = None
+    if job is None:
+        if not st.button(f"Build {label}", key=f"build_{file_name}"):
+            return
+        job = jobs.submit(key, build, *args)
+
+    if job.done():
+        st.download_button(label=f"Download {label}", data=job.result(), file_name=file_name,
+                           mime="application/pdf", key=f"download_{file_name}")
+        return
+
+    st.session_state[state_key] = (key, job)
+    # Only this fragment polls; the whole page reruns once the build is done
+    @st.fragment(run_every=REPORT_POLL_SECONDS)
+    def wait_for_build():
+        if job.done():
+            st.rerun()
+        st.info(f"Building the {label}...")
+
+    wait_for_build()
 
-            participant_1st = str(row.get(f"Race{race_num}_1st", "0")).strip()
-            participant_2nd = str(row.get(f"Race{race_num}_2nd", "0")).strip()
-            participant_3rd = str(row.get(f"Race{race_num}_3rd", "0")).strip()
-
-            points = 0
-            if participant_1st == actual_1st:
-                points += 12
-            if participant_2nd == actual_2nd:
-                points += 6
-            if participant_3rd == actual_3rd:
-                points += 2
-
-            detailed_results.append({
-                "Name": participant_name,
-                "Race": f"Race {race_num}",
-                "1st Place Guess": participant_1st,
-                "1st Place Actual": actual_1st,
-                "1st Place Correct": participant_1st == actual_1st,
-                "2nd Place Guess": participant_2nd,
-                "2nd Place Actual": actual_2nd,
-                "2nd Place Correct": participant_2nd == actual_2nd,
-                "3rd Place Guess": participant_3rd,
-                "3rd Place Actual": actual_3rd,
-                "3rd Place Correct": participant_3rd == actual_3rd,
-                "Points": points
-            })
-
-        # Process Opt Six (OPT2 to OPT7)
-        opt_actual = [str(correct_answers.get(f"OPT{i}", "0")).strip() for i in range(2, 8)]
-        if any(value != "0" for value in opt_actual):
-            participant_opt_guesses = [str(row.get(f"OPT{i}", "0")).strip() for i in range(2, 8)]
-            for idx, opt_num in enumerate(range(2, 8)):
-                actual = opt_actual[idx]
-                guess = participant_opt_guesses[idx]
-                if actual == "0":
-                    continue  # Skip if actual is 0
-                is_correct = guess == actual
-                points = 1 if is_correct else 0
-                detailed_results.append({
-                    "Name": participant_name,
-                    "Race": f"OPT{opt_num}",
-                    "1st Place Guess": guess,
-                    "1st Place Actual": actual,
-                    "1st Place Correct": is_correct,
-                    "2nd Place Guess": "",
-                    "2nd Place Actual": "",
-                    "2nd Place Correct": False,
-                    "3rd Place Guess": "",
-                    "3rd Place Actual": "",
-                    "3rd Place Correct": False,
-                    "Points": points
-                })
-
-    return pd.DataFrame(detailed_results)
-
-def create_pdf(filtered_df, correct_summary, top_scorers_dict, lucky_draw_winners):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    # Title
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, height - 50, "Race Guess Analyzer - Detailed Report")
-
-    y_position = height - 80
-
-    # Summary Section
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y_position, "Summary of Participant Performance:")
-    y_position -= 20
-
-    p.setFont("Helvetica", 10)
-    for _, row in correct_summary.iterrows():
-        summary_text = f"{row['Name']}: {row['Points']} Points | 1st Place Correct: {int(row['1st Place Correct'])} | " \
-                       f"2nd Place Correct: {int(row['2nd Place Correct'])} | 3rd Place Correct: {int(row['3rd Place Correct'])}"
-        p.drawString(50, y_position, summary_text)
-        y_position -= 15
-        if y_position < 50:
-            p.showPage()
-            y_position = height - 50
-
-    # Top Scorer Section
-    if top_scorers_dict:
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y_position - 10, "Top Performers:")
-        y_position -= 30
-        p.setFont("Helvetica", 10)
-        for category, scorers in top_scorers_dict.items():
-            p.drawString(50, y_position, f"{category}:")
-            y_position -= 15
-            for scorer in scorers:
-                p.drawString(70, y_position, f"- {scorer}")
-                y_position -= 15
-                if y_position < 50:
-                    p.showPage()
-                    y_position = height - 50
-
-    # Lucky Draw Winners
-    if lucky_draw_winners:
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y_position - 10, "Lucky Draw Winners:")
-        y_position -= 30
-        p.setFont("Helvetica", 10)
-        for category, winner in lucky_draw_winners.items():
-            p.drawString(50, y_position, f"{category}: {winner}")
-            y_position -= 15
-            if y_position < 50:
-                p.showPage()
-                y_position = height - 50
-
-    # Detailed Results Section
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y_position - 10, "Detailed Results:")
-    y_position -= 30
-
-    headers = list(filtered_df.columns)
-    line_height = 15
-
-    # Print headers
-    for i, header in enumerate(headers):
-        p.drawString(50 + i * 100, y_position, header)
-    y_position -= line_height
-
-    # Print rows
-    for _, row in filtered_df.iterrows():
-        for i, value in enumerate(row):
-            p.drawString(50 + i * 100, y_position, str(value))
-        y_position -= line_height
-        if y_position < 50:
-            p.showPage()
-            y_position = height - 50
-
-    p.save()
-    buffer.seek(0)
-    return buffer
 
 def create_header_with_logo():
     # Custom CSS for high-quality image rendering
@@ -180,32 +336,15 @@ def create_header_with_logo():
     col1, col2 = st.columns([1, 4])
     with col1:
         try:
-            # Open and process the image with PIL
-
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            logo_path = os.path.join(base_dir, 'pic.png')
-            image = Image.open(logo_path)
-            
-            # If the image is not in RGBA/RGB format, convert it
-            if image.mode not in ('RGBA', 'RGB'):
-                image = image.convert('RGBA')
-            
-            # Calculate the display size while maintaining aspect ratio
-            original_width, original_height = image.size
             target_width = 300  # Desired width
-            aspect_ratio = original_height / original_width
-            target_height = int(target_width * aspect_ratio)
-            
-            # Resize using high-quality resampling
-            image = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            
-            # Display the processed image
-            st.image(image, 
+
+            # Display the resized logo, cached across reruns and sessions
+            st.image(logo_png('pic.png', target_width),
                     use_column_width=False,
                     width=target_width,
                     output_format='PNG',  # Force PNG format for better quality
                     clamp=False)  # Prevent color clamping
-            
+
         except Exception as e:
             st.error(f"Error loading logo: {str(e)}")
             
@@ -231,26 +370,13 @@ def add_sidebar_logo():
     with st.sidebar:
         st.markdown('<div class="sidebar-logo">', unsafe_allow_html=True)
         try:
-            # Open and process the image with PIL
-            image = Image.open('pic2.png')
-            
-            # Convert image to RGBA if needed
-            if image.mode not in ('RGBA', 'RGB'):
-                image = image.convert('RGBA')
-            
-            # Calculate dimensions while maintaining aspect ratio
             target_width = 200  # Adjust this value to match your sidebar width
-            aspect_ratio = image.height / image.width
-            target_height = int(target_width * aspect_ratio)
-            
-            # Resize image
-            image = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            
-            # Display the image
-            st.image(image, 
+
+            # Display the resized logo, cached across reruns and sessions
+            st.image(logo_png('pic2.png', target_width),
                     use_column_width=True,
                     output_format='PNG')
-            
+
         except Exception as e:
             st.error(f"Error loading sidebar logo: {str(e)}")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -258,6 +384,23 @@ def add_sidebar_logo():
 # Initialize session state for lucky draw winners as a dictionary
 if 'lucky_draw_winners' not in st.session_state:
     st.session_state.lucky_draw_winners = {}
+# Track all previous lucky draw winners globally
+if 'all_lucky_draw_winners' not in st.session_state:
+    st.session_state.all_lucky_draw_winners = set()
+
+RULES = current_rules()
+
+# Session state keys of the answer inputs, by answer column. The inputs take
+# their values from here so saved answers can be restored into them.
+ANSWER_INPUT_KEYS = {}
+for race_num in RULES.races:
+    ANSWER_INPUT_KEYS[f"Race{race_num}_1st"] = f"first_{race_num}"
+    ANSWER_INPUT_KEYS[f"Race{race_num}_2nd"] = f"second_{race_num}"
+    ANSWER_INPUT_KEYS[f"Race{race_num}_3rd"] = f"third_{race_num}"
+for i in RULES.opt_races:
+    ANSWER_INPUT_KEYS[f"OPT{i}"] = f"opt_{i}"
+for key in ANSWER_INPUT_KEYS.values():
+    st.session_state.setdefault(key, "0")
 
 # Streamlit app layout with custom styling
 st.set_page_config(page_title="AESGC Race Predictor Pro",
@@ -294,266 +437,273 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Stage timings for this rerun: logged as JSON lines, shown in the sidebar
+# with ?debug=1, and profiled with cProfile for one rerun with ?profile=1
+configure_logging()
+# A rerun interrupted by a widget click raises out of the script before the
+# end, so its timer and profiler are finished here, by the session's next
+# rerun, instead: the profile is still saved and cProfile doesn't stay on
+for unfinished in st.session_state.pop("unfinished_rerun", ()):
+    unfinished.stop()
+debug_mode = st.query_params.get("debug") == "1" or env_flag(DEBUG_ENV)
+profiler = None
+if st.query_params.get("profile") == "1" or env_flag(PROFILE_ENV):
+    profiler = RerunProfiler().start()
+    if "profile" in st.query_params:
+        # Only this rerun is profiled when requested through the URL
+        del st.query_params["profile"]
+timer = RerunTimer(track_memory=debug_mode)
+st.session_state.unfinished_rerun = [timer] + ([profiler] if profiler else [])
+
 # Call functions to create headers and logos
-create_header_with_logo()
-add_sidebar_logo()
+with timer.stage("logos"):
+    create_header_with_logo()
+    add_sidebar_logo()
 
 st.title("🏇 AESGC Race Predictor Pro")
 st.write("Upload the participant guesses file and enter the correct answers to analyze results.")
 
-# Sidebar for file upload and race inputs
+# Live mode follows files on disk instead of an upload and the answer inputs
 with st.sidebar:
-    guesses_file = st.file_uploader("", type=["csv"])
-
-    st.header("Enter Correct Answers")
-    correct_answers = {}
-    valid_race_count = 0
-    MAX_POINTS_PER_RACE = 21
-    TOTAL_RACES = 6
-    MAX_TOTAL_POINTS = MAX_POINTS_PER_RACE * TOTAL_RACES
-
-    # Color palette for race containers
-    colors = ['#ffecec', '#ecffec', '#ecebff', '#fff6ec', '#f6ecff', '#ecfff6']
-
-    for race_num in range(2, 8):
-        # Create a unique container for each race with different styling
-        with st.container():
-            st.markdown(f"""
-                <div style="
-                    background-color: {colors[(race_num-2)%len(colors)]};
-                    padding: 15px;
-                    border-radius: 10px;
-                    margin: 10px 0;
-                    border: 1px solid rgba(49, 51, 63, 0.2);
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                ">
-                    <h3 style="color: #333; margin-bottom: 10px; font-size: 1.1em;">Race {race_num}</h3>
-                </div>
-                """, unsafe_allow_html=True)
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                correct_answers[f"Race{race_num}_1st"] = st.text_input(
-                    "1st",
-                    value="0",
-                    key=f"first_{race_num}",
-                    help=f"Enter horse number for 1st place in Race {race_num}"
-                )
-
-            with col2:
-                correct_answers[f"Race{race_num}_2nd"] = st.text_input(
-                    "2nd",
-                    value="0",
-                    key=f"second_{race_num}",
-                    help=f"Enter horse number for 2nd place in Race {race_num}"
-                )
-
-            with col3:
-                correct_answers[f"Race{race_num}_3rd"] = st.text_input(
-                    "3rd",
-                    value="0",
-                    key=f"third_{race_num}",
-                    help=f"Enter horse number for 3rd place in Race {race_num}"
-                )
-
-            if (correct_answers[f"Race{race_num}_1st"] != "0" or
-                correct_answers[f"Race{race_num}_2nd"] != "0" or
-                correct_answers[f"Race{race_num}_3rd"] != "0"):
-                valid_race_count += 1
-
-    # Input for Opt Six (OPT2 to OPT7)
-    with st.container():
-        st.markdown(f"""
-            <div style="
-                background-color: {colors[0]};
-                padding: 15px;
-                border-radius: 10px;
-                margin: 10px 0;
-                border: 1px solid rgba(49, 51, 63, 0.2);
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            ">
-                <h3 style="color: #333; margin-bottom: 10px; font-size: 1.1em;">Opt Six</h3>
-            </div>
-            """, unsafe_allow_html=True)
-
-        opt_cols = st.columns(6)
-        for idx, i in enumerate(range(2, 8)):
-            with opt_cols[idx]:
-                correct_answers[f"OPT{i}"] = st.text_input(
-                    f"OPT{i}",
-                    value="0",
-                    key=f"opt_{i}",
-                    help=f"Enter correct value for OPT{i}"
-                )
-
-    # Update valid_race_count
-    opt_values = [correct_answers[f"OPT{i}"] for i in range(2, 8)]
-    if any(value != "0" for value in opt_values):
-        valid_race_count += 1
-        MAX_TOTAL_POINTS += 6  # 1 point per correct Opt Six guess
-
-
-if valid_race_count == 0:
+    live_mode = st.toggle("Live mode", key="live_mode",
+                          help="Follow an answers file and a directory of guesses files as they change")
+    if live_mode:
+        live_answers_path = st.text_input("Answers file", value=LIVE_ANSWERS_PATH,
+                                          help="JSON or CSV answers, rewritten as each race finishes")
+        live_guesses_dir = st.text_input("Guesses directory", value=LIVE_GUESSES_DIR,
+                                         help="Every .csv here is scored; later files replace earlier rows with the same name")
+        live_interval = st.number_input("Refresh every (seconds)", min_value=1, max_value=300,
+                                        value=LIVE_REFRESH_SECONDS)
+
+# Sidebar for file upload and race inputs
+if not live_mode:
+    with st.sidebar:
+        guesses_file = st.file_uploader("", type=["csv"])
+        if guesses_file:
+            try:
+                with timer.stage("parse") as stage:
+                    guesses_hash, guesses_df, guesses_report = load_guesses(guesses_file)
+                    stage["rows"] = len(guesses_df)
+            except ValueError as e:
+                st.error(f"Couldn't read the guesses file: {e}")
+                guesses_file = None
+            else:
+                restore_event(guesses_hash)
+
+        st.header("Enter Correct Answers")
+        correct_answers = {}
+        valid_race_count = 0
+
+        # Color palette for race containers
+        colors = ['#ffecec', '#ecffec', '#ecebff', '#fff6ec', '#f6ecff', '#ecfff6']
+
+        for race_index, race_num in enumerate(RULES.races):
+            # Create a unique container for each race with different styling
+            with st.container():
+                st.markdown(f"""
+                    <div style="
+                        background-color: {colors[race_index % len(colors)]};
+                        padding: 15px;
+                        border-radius: 10px;
+                        margin: 10px 0;
+                        border: 1px solid rgba(49, 51, 63, 0.2);
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    ">
+                        <h3 style="color: #333; margin-bottom: 10px; font-size: 1.1em;">Race {race_num}</h3>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    correct_answers[f"Race{race_num}_1st"] = st.text_input(
+                        "1st",
+                        key=f"first_{race_num}",
+                        help=f"Enter horse number for 1st place in Race {race_num}"
+                    )
+
+                with col2:
+                    correct_answers[f"Race{race_num}_2nd"] = st.text_input(
+                        "2nd",
+                        key=f"second_{race_num}",
+                        help=f"Enter horse number for 2nd place in Race {race_num}"
+                    )
+
+                with col3:
+                    correct_answers[f"Race{race_num}_3rd"] = st.text_input(
+                        "3rd",
+                        key=f"third_{race_num}",
+                        help=f"Enter horse number for 3rd place in Race {race_num}"
+                    )
+
+                if (correct_answers[f"Race{race_num}_1st"] != "0" or
+                    correct_answers[f"Race{race_num}_2nd"] != "0" or
+                    correct_answers[f"Race{race_num}_3rd"] != "0"):
+                    valid_race_count += 1
+
+        # Input for Opt Six (OPT2 to OPT7 by default)
+        if RULES.opt_races:
+            with st.container():
+                st.markdown(f"""
+                    <div style="
+                        background-color: {colors[0]};
+                        padding: 15px;
+                        border-radius: 10px;
+                        margin: 10px 0;
+                        border: 1px solid rgba(49, 51, 63, 0.2);
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    ">
+                        <h3 style="color: #333; margin-bottom: 10px; font-size: 1.1em;">Opt Six</h3>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                opt_cols = st.columns(len(RULES.opt_races))
+                for idx, i in enumerate(RULES.opt_races):
+                    with opt_cols[idx]:
+                        correct_answers[f"OPT{i}"] = st.text_input(
+                            f"OPT{i}",
+                            key=f"opt_{i}",
+                            help=f"Enter correct value for OPT{i}"
+                        )
+
+        # Update valid_race_count
+        opt_values = [correct_answers[f"OPT{i}"] for i in RULES.opt_races]
+        if any(value != "0" for value in opt_values):
+            valid_race_count += 1
+
+
+if not live_mode and guesses_file:
+    show_guesses_report(guesses_report)
+
+if live_mode:
+    show_live_event(get_live_event(live_answers_path, live_guesses_dir, RULES.fingerprint, RULES), live_interval)
+elif valid_race_count == 0:
     st.warning("No valid race results entered. Please input at least one non-zero value for any race or Opt Six.")
 else:
     if guesses_file:
-        guesses_df = pd.read_csv(guesses_file)
-        detailed_results_df = analyze_guesses(guesses_df, correct_answers)
+        with timer.stage("score") as stage:
+            scorer = get_scorer(guesses_hash, guesses_df, correct_answers)
+            save_answers(guesses_hash, correct_answers)
+            detailed_results_df = scorer.results
+            stage["rows"] = len(detailed_results_df)
 
-        with st.container():
-            st.subheader("Detailed Results")
-            st.dataframe(detailed_results_df[["Name", "Points"]])
-
-            st.divider()
+        with timer.stage("participant_index", rows=len(guesses_df)):
+            participant_index = get_participant_index(guesses_hash, guesses_df)
 
         # Summarize Performance
-        correct_summary = (
-            detailed_results_df
-            .groupby("Name")[["1st Place Correct", "2nd Place Correct", "3rd Place Correct", "Points"]]
-            .sum()
-            .reset_index()
-        )
+        with timer.stage("summary") as stage:
+            correct_summary = scorer.summary()
+            stage["rows"] = len(correct_summary)
 
-       # Track all previous lucky draw winners globally
-        if 'all_lucky_draw_winners' not in st.session_state:
-            st.session_state.all_lucky_draw_winners = set()
+        with st.container(), timer.stage("results_table", rows=len(correct_summary)):
+            st.subheader("Leaderboard")
+            show_leaderboard(scorer.points_table().ranking())
 
-        # Apply filtered conditions for top performers
-        # For Race 2 and Race 3 combined, participants with score >=28
-        race_2_3_df = detailed_results_df[
-            detailed_results_df['Race'].isin(['Race 2', 'Race 3'])
-        ]
-        race_2_3_points = race_2_3_df.groupby('Name')['Points'].sum().reset_index()
-        race_2_3_top = race_2_3_points[
-            (race_2_3_points['Points'] >= 28) & 
-            (~race_2_3_points['Name'].isin(st.session_state.all_lucky_draw_winners))
-        ]['Name']
-
-        # For Opt Six, participants with score >=3
-        opt_six_df = detailed_results_df[
-            detailed_results_df['Race'].str.startswith('OPT')
-        ]
-        opt_six_points = opt_six_df.groupby('Name')['Points'].sum().reset_index()
-        opt_six_top = opt_six_points[
-            (opt_six_points['Points'] >= 3) & 
-            (~opt_six_points['Name'].isin(st.session_state.all_lucky_draw_winners))
-        ]['Name']
-
-        # For Races 4-7, identify participants with highest total points
-        races_4_7_df = detailed_results_df[
-            detailed_results_df['Race'].isin(['Race 4', 'Race 5', 'Race 6', 'Race 7'])
-        ]
-        races_4_7_points = races_4_7_df.groupby('Name')['Points'].sum().reset_index()
-        max_points_races_4_7 = races_4_7_points['Points'].max()
-        races_4_7_top = races_4_7_points[
-            (races_4_7_points['Points'] == max_points_races_4_7) & 
-            (~races_4_7_points['Name'].isin(st.session_state.all_lucky_draw_winners))
-        ]['Name']
-
-        # Prepare top_scorers dictionary
-        top_scorers_dict = {}
-        if not race_2_3_top.empty:
-            top_scorers_dict['Races 2 & 3'] = race_2_3_top.tolist()
-        if not opt_six_top.empty:
-            top_scorers_dict['Opt Six'] = opt_six_top.tolist()
-        if not races_4_7_top.empty:
-            top_scorers_dict['Races 4-7'] = races_4_7_top.tolist()
+            st.subheader("Accuracy by Race")
+            st.bar_chart(scorer.slot_accuracy(), stack=False, x_label="Race", y_label="Share correct")
+
+            st.subheader("Detailed Results")
+            show_results_page(scorer.points_table().ranked_summary(), detailed_results_df,
+                              participant_index, len(scorer.labels))
+
+            st.divider()
+
+        with timer.stage("top_performers", rows=len(correct_summary)):
+            top_scorers_dict = find_top_performers(scorer.points_table(), st.session_state.all_lucky_draw_winners,
+                                                   RULES.prize_categories)
 
         # Display Top Performers
         st.subheader("Top Performers")
 
-        # For Races 2 & 3
-        if 'Races 2 & 3' in top_scorers_dict:
-            st.write("**Top Performers for Races 2 & 3**")
-            st.success("Participants who scored >=28 points in Races 2 & 3:")
-            for name in top_scorers_dict['Races 2 & 3']:
-                st.write(f"- {name}")
-            # Lucky Draw if multiple top scorers
-            if len(top_scorers_dict['Races 2 & 3']) > 1:
-                if st.button("Conduct Lucky Draw for Races 2 & 3"):
-                    winner = random.choice(top_scorers_dict['Races 2 & 3'])
-                    st.session_state.lucky_draw_winners['Races 2 & 3'] = winner
-                    st.session_state.all_lucky_draw_winners.add(winner)
-                if 'Races 2 & 3' in st.session_state.lucky_draw_winners:
-                    st.info(f"Lucky Draw Winner for Races 2 & 3: {st.session_state.lucky_draw_winners['Races 2 & 3']}")
-            elif len(top_scorers_dict['Races 2 & 3']) == 1:
-                st.success(f"Single Winner for Races 2 & 3: {top_scorers_dict['Races 2 & 3'][0]}")
-
-        # For Opt Six
-        if 'Opt Six' in top_scorers_dict:
-            st.write("**Top Performers for Opt Six**")
-            st.success("Participants who scored >=3 points in Opt Six:")
-            for name in top_scorers_dict['Opt Six']:
-                st.write(f"- {name}")
-            # Lucky Draw if multiple top scorers
-            if len(top_scorers_dict['Opt Six']) > 1:
-                if st.button("Conduct Lucky Draw for Opt Six"):
-                    winner = random.choice(top_scorers_dict['Opt Six'])
-                    st.session_state.lucky_draw_winners['Opt Six'] = winner
-                    st.session_state.all_lucky_draw_winners.add(winner)
-                if 'Opt Six' in st.session_state.lucky_draw_winners:
-                    st.info(f"Lucky Draw Winner for Opt Six: {st.session_state.lucky_draw_winners['Opt Six']}")
-            elif len(top_scorers_dict['Opt Six']) == 1:
-                st.success(f"Single Winner for Opt Six: {top_scorers_dict['Opt Six'][0]}")
-
-        # For Races 4-7
-        if 'Races 4-7' in top_scorers_dict:
-            st.write("**Top Performers for Races 4-7**")
-            st.success("Participants with the highest points in Races 4-7:")
-            for name in top_scorers_dict['Races 4-7']:
+        for category in RULES.prize_categories:
+            if category.name not in top_scorers_dict:
+                continue
+            winners = top_scorers_dict[category.name]
+            st.write(f"**Top Performers for {category.name}**")
+            st.success(f"{category.description}:")
+            for name in winners:
                 st.write(f"- {name}")
             # Lucky Draw if multiple top scorers
-            if len(top_scorers_dict['Races 4-7']) > 1:
-                if st.button("Conduct Lucky Draw for Races 4-7"):
-                    winner = random.choice(top_scorers_dict['Races 4-7'])
-                    st.session_state.lucky_draw_winners['Races 4-7'] = winner
+            if len(winners) > 1:
+                if st.button(f"Conduct Lucky Draw for {category.name}"):
+                    winner = random.choice(winners)
+                    st.session_state.lucky_draw_winners[category.name] = winner
                     st.session_state.all_lucky_draw_winners.add(winner)
-                if 'Races 4-7' in st.session_state.lucky_draw_winners:
-                    st.info(f"Lucky Draw Winner for Races 4-7: {st.session_state.lucky_draw_winners['Races 4-7']}")
-            elif len(top_scorers_dict['Races 4-7']) == 1:
-                st.success(f"Single Winner for Races 4-7: {top_scorers_dict['Races 4-7'][0]}")
+                    get_store().save_lucky_draw(guesses_hash, category.name, winner)
+                if category.name in st.session_state.lucky_draw_winners:
+                    st.info(f"Lucky Draw Winner for {category.name}: {st.session_state.lucky_draw_winners[category.name]}")
+            elif len(winners) == 1:
+                st.success(f"Single Winner for {category.name}: {winners[0]}")
 
         st.divider()
 
         # Analyze Specific Participant
         st.subheader("Analyze Specific Participant")
-        participant_names = detailed_results_df["Name"].unique()
-        selected_participant = st.selectbox("Select a Participant", options=participant_names)
+        participant_query = st.text_input(
+            "Search participants",
+            help="Type the start of a name, or any part of it"
+        )
+        selected_participant = st.selectbox(
+            "Select a Participant",
+            options=participant_index.search(participant_query)
+        )
 
-        participant_results = detailed_results_df[detailed_results_df["Name"] == selected_participant]
+        participant_results = detailed_results_df.iloc[
+            participant_index.rows(selected_participant, len(scorer.labels))
+        ]
         if not participant_results.empty:
             total_correct = participant_results[["1st Place Correct", "2nd Place Correct", "3rd Place Correct"]].sum().sum()
             if total_correct == 0:
                 st.warning(f"{selected_participant} had no correct guesses.")
             else:
-                st.dataframe(participant_results)
+                st.dataframe(render_results(participant_results))
 
                 st.divider()
 
                 # Gauge Chart for Total Points
                 st.subheader(f"Total Points for {selected_participant}")
+                ranking = scorer.points_table().ranking()
+                st.caption(f"Ranked {ranking.rank(selected_participant)} of {len(ranking)}")
                 total_points = participant_results["Points"].sum()
-                fig_points = go.Figure(go.Indicator(
-                    mode="number+gauge",
-                    value=total_points,
-                    title={"text": "Total Points"},
-                    gauge={"axis": {"range": [0, MAX_TOTAL_POINTS]}},
-                ))
-                st.plotly_chart(fig_points)
+                with timer.stage("gauge", rows=len(participant_results)):
+                    # Out of the most the rules allow over the slots with results
+                    st.plotly_chart(points_gauge(int(total_points), RULES.max_points(scorer.labels)))
 
         # Provide option to download detailed results as a PDF
         st.divider()
         st.subheader("Download Results")
-        pdf_buffer = create_pdf(
-            detailed_results_df,  # Use the full detailed results
-            correct_summary,
-            top_scorers_dict,
-            st.session_state.lucky_draw_winners
-        )
-        st.download_button(
-            label="Download Detailed Results as PDF",
-            data=pdf_buffer,
-            file_name="detailed_results.pdf",
-            mime="application/pdf",
+        summary_only = st.checkbox(
+            "Summary and winners only",
+            help="Leave out the per-race detail table, which can run to thousands of pages for large events"
         )
+        lucky_draw_winners = dict(st.session_state.lucky_draw_winners)
+
+        # Reports are built in the background and kept per results and lucky
+        # draw state, so any session asking for the same report gets it at once
+        jobs = get_job_queue()
+        slots = tuple(active_slots(correct_answers, RULES))
+        col1, col2 = st.columns(2)
+        with col1:
+            winners = tuple((category, tuple(names)) for category, names in top_scorers_dict.items())
+            report_key = ("report", guesses_hash, RULES.fingerprint, slots, winners,
+                          tuple(sorted(lucky_draw_winners.items())), summary_only)
+            show_artifact(jobs, report_key, "PDF report", "detailed_results.pdf", build_report,
+                          detailed_results_df, correct_summary, top_scorers_dict, lucky_draw_winners, not summary_only)
+        with col2:
+            show_artifact(jobs, ("slips", guesses_hash, RULES.fingerprint, slots), "participant slips",
+                          "participant_slips.pdf", build_slips, detailed_results_df, len(scorer.labels))
+
+timer.stop()
+if profiler:
+    profiler.stop()
+del st.session_state.unfinished_rerun
+
+if debug_mode or profiler:
+    with st.sidebar:
+        st.divider()
+        st.header("Debug: rerun timings")
+        st.dataframe(pd.DataFrame(timer.stages).drop(columns="run"), hide_index=True)
+        st.caption(f"Total: {sum(stage['seconds'] for stage in timer.stages):.3f} s")
+        if profiler:
+            st.caption(f"Profile saved to {profiler.path}")
+            st.code(profiler.top(), language=None)
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cache import LRUCache
+
+
+def _finished(data):
+    job = Future()
+    job.set_result(data)
+    return job
+
+
+class JobQueue:
+    # Runs artifact builds (PDF reports, participant slips) on a small thread
+    # pool so reruns never wait for them, and keeps the finished bytes in a
+    # byte-bounded LRU so asking for the same key again is instant. A key is
+    # built at most once at a time however many sessions submit it. Only
+    # running builds are tracked: a failed build, or bytes too large for the
+    # cache, reach the submitter through its future and are not kept. Shared
+    # between sessions.
+
+    def __init__(self, workers, max_bytes):
+        self.artifacts = LRUCache(max_bytes, sizeof=len)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, build, *args):
+        # Start building build(*args) for key unless it is already built or
+        # being built. A failed build is retried on the next submit.
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+            data = self.artifacts.get(key)
+            if data is None:
+                job = self._executor.submit(self._run, key, build, args)
+                self._jobs[key] = job
+                return job
+        return _finished(data)
+
+    def _run(self, key, build, args):
+        try:
+            return self.artifacts.put(key, build(*args))
+        finally:
+            # Finished either way: from here the artifact cache answers for
+            # the key, or nothing does
+            with self._lock:
+                self._jobs.pop(key, None)
+
+    def job(self, key):
+        # The future for key: finished if the artifact is cached, the running
+        # or queued job, or None otherwise
+        data = self.artifacts.get(key)
+        if data is not None:
+            return _finished(data)
+        with self._lock:
+            return self._jobs.get(key)
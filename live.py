@@ -0,0 +1,114 @@
+import glob
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from rules import DEFAULT_RULES
+from scoring import IncrementalScorer, PointsTable, read_answers, read_guesses
+
+
+# What a poll saw, copied under the lock so it can be rendered while other
+# sessions keep polling: the changes it applied, the files that couldn't be
+# read ({path: error}), the guesses files, the merged PointsTable (None before
+# any guesses file was read) and when the totals last changed
+LiveSnapshot = namedtuple("LiveSnapshot", ["changes", "errors", "files", "table", "updated_at"])
+
+
+def _stamp(path):
+    # Changes whenever the file is rewritten; None if it doesn't exist
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LiveEvent:
+    # Scores an event from files that change while it runs: an answers file
+    # (JSON or CSV, as read by read_answers) updated as each race finishes,
+    # and a directory of guesses CSVs that late entries and corrections are
+    # dropped into. poll() picks up what changed since the last call and
+    # applies it as a delta: a new answers file only rescores the slots whose
+    # answers differ, and a new or rewritten guesses file only scores that
+    # file. Rows in a file replace the rows with the same name in files that
+    # sort before it, so a corrections file can be named to sort last.
+    # Shared between sessions; poll() is serialized with a lock.
+
+    def __init__(self, answers_path, guesses_dir, rules=DEFAULT_RULES):
+        self.answers_path = answers_path
+        self.guesses_dir = guesses_dir
+        self.rules = rules
+        self.correct_answers = {}
+        self.errors = {}
+        self.updated_at = None
+        self._answers_stamp = None
+        self._files = {}  # path -> (stamp, IncrementalScorer)
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def files(self):
+        return sorted(self._files)
+
+    def poll(self):
+        # Apply any changes on disk; returns a LiveSnapshot with a
+        # description of each change. A file that can't be read yet (e.g.
+        # half written) keeps its last good state and is retried on the next
+        # poll.
+        with self._lock:
+            changes = []
+            stamp = _stamp(self.answers_path)
+            if stamp != self._answers_stamp:
+                try:
+                    answers = read_answers(self.answers_path, self.rules) if stamp else {}
+                except (OSError, ValueError) as e:
+                    self.errors[self.answers_path] = str(e)
+                else:
+                    self.errors.pop(self.answers_path, None)
+                    self._answers_stamp = stamp
+                    if answers != self.correct_answers:
+                        self.correct_answers = answers
+                        changes.append("answers updated")
+
+            current = {path: _stamp(path) for path in glob.glob(os.path.join(self.guesses_dir, "*.csv"))}
+            for path in sorted(self._files.keys() - current.keys()):
+                del self._files[path]
+                self.errors.pop(path, None)
+                changes.append(f"removed {os.path.basename(path)}")
+            for path, stamp in sorted(current.items()):
+                entry = self._files.get(path)
+                if entry is not None and entry[0] == stamp:
+                    continue
+                try:
+                    scorer = IncrementalScorer(read_guesses(path, self.rules), self.rules)
+                except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                    self.errors[path] = str(e)
+                    continue
+                self.errors.pop(path, None)
+                self._files[path] = (stamp, scorer)
+                changes.append(f"{'reloaded' if entry else 'added'} {os.path.basename(path)}")
+
+            if changes:
+                for _, scorer in self._files.values():
+                    scorer.update(self.correct_answers)
+                self._table = self._merge()
+                self.updated_at = time.time()
+            return LiveSnapshot(changes, dict(self.errors), self.files, self._table, self.updated_at)
+
+    def _merge(self):
+        if not self._files:
+            return None
+        tables, seen = [], set()
+        for path in sorted(self._files, reverse=True):
+            table = self._files[path][1].points_table()
+            tables.append(PointsTable(table.frame[~table.frame["Name"].isin(seen)], table.labels))
+            seen.update(table.frame["Name"])
+        return PointsTable.merge(tables)
+
+    def points_table(self):
+        # Totals across every guesses file as of the last poll, or None
+        # before any guesses file has been read
+        return self._table
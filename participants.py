@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class ParticipantIndex:
+    # Name lookup for a normalized guesses frame, built once per upload.
+    # positions() returns the participant rows with a given name without
+    # scanning the frame, and search() finds names by prefix or substring
+    # without listing every name in the UI.
+
+    def __init__(self, names):
+        # names is the categorical Name column from normalize_guesses
+        self.names = names.cat.categories
+        codes = names.cat.codes.to_numpy()
+        self._order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[self._order]
+        name_codes = np.arange(len(self.names))
+        self._starts = np.searchsorted(sorted_codes, name_codes, side="left")
+        self._ends = np.searchsorted(sorted_codes, name_codes, side="right")
+
+        # Lower-cased names, plus their sorted order for prefix lookups
+        self._lower = np.array([str(name).lower() for name in self.names], dtype=str)
+        self._lower_order = np.argsort(self._lower, kind="stable")
+        self._lower_sorted = self._lower[self._lower_order]
+
+    def __len__(self):
+        return len(self.names)
+
+    def positions(self, name):
+        # Row positions of every participant with this name in the guesses frame
+        try:
+            code = self.names.get_loc(name)
+        except KeyError:
+            return np.array([], dtype=np.intp)
+        return self._order[self._starts[code]:self._ends[code]]
+
+    def rows(self, name, slots_per_participant):
+        # Row positions in the results frame, which holds slots_per_participant
+        # consecutive rows for each participant
+        positions = self.positions(name)
+        return (positions[:, None] * slots_per_participant + np.arange(slots_per_participant)).ravel()
+
+    def search(self, query, limit=50):
+        # Names starting with the query (case-insensitive), followed by names
+        # containing it, at most limit in total
+        query = query.strip().lower()
+        if not query:
+            return list(self.names[self._lower_order[:limit]])
+        start = np.searchsorted(self._lower_sorted, query, side="left")
+        end = np.searchsorted(self._lower_sorted, query + "\U0010ffff", side="left")
+        matches = list(self._lower_order[start:min(end, start + limit)])
+        if len(matches) < limit:
+            seen = set(matches)
+            contains = np.flatnonzero(np.char.find(self._lower, query) >= 0)
+            matches += [code for code in contains if code not in seen][:limit - len(matches)]
+        return list(self.names[matches])
@@ -0,0 +1,127 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+logger = logging.getLogger("race_predictor.timing")
+
+# Set to 1 to show the timing panel / profile every rerun without the
+# ?debug=1 / ?profile=1 query parameters
+DEBUG_ENV = "RACE_DEBUG"
+PROFILE_ENV = "RACE_PROFILE"
+PROFILE_DIR = os.environ.get("RACE_PROFILE_DIR", tempfile.gettempdir())
+
+# tracemalloc is process-wide, so it is shared by every timer tracking memory
+# (one per debug rerun, across sessions). It is started by the first and only
+# stopped once the last one finishes, and never if something else started it.
+# A timer whose rerun was interrupted before stop() lets go when collected.
+_tracing_lock = threading.RLock()
+_tracing_timers = 0
+_tracing_started = False
+
+
+def configure_logging():
+    # One JSON object per line on stderr. Safe to call on every rerun.
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class RerunTimer:
+    # Records wall time, rows processed and (optionally) peak Python memory
+    # for each stage of a rerun, and logs every stage as a JSON line.
+    # Memory tracking uses tracemalloc, which slows everything down, so it is
+    # only switched on when the timings are going to be looked at.
+
+    def __init__(self, run="rerun", track_memory=False):
+        self.run = run
+        self.track_memory = track_memory
+        self.stages = []
+        self._tracing = False
+        if track_memory:
+            self._start_tracing()
+
+    def _start_tracing(self):
+        global _tracing_timers, _tracing_started
+        with _tracing_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_started = True
+            _tracing_timers += 1
+            self._tracing = True
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        # The yielded dict can be updated inside the block, e.g. to set the
+        # row count once it is known.
+        record = {"run": self.run, "stage": name, "rows": rows}
+        if self.track_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            if self.track_memory:
+                record["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+            self.stages.append(record)
+            logger.info(json.dumps(record, default=str))
+
+    def stop(self):
+        global _tracing_timers, _tracing_started
+        with _tracing_lock:
+            if not self._tracing:
+                return
+            self._tracing = False
+            _tracing_timers -= 1
+            if _tracing_timers == 0 and _tracing_started:
+                tracemalloc.stop()
+                _tracing_started = False
+
+    def __del__(self):
+        self.stop()
+
+
+class RerunProfiler:
+    # cProfile capture of a single rerun, saved as a .prof file that can be
+    # opened with pstats or snakeviz.
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.path = None
+        self.running = False
+
+    def start(self):
+        self.profile.enable()
+        self.running = True
+        return self
+
+    def stop(self):
+        # Safe to call again once stopped
+        if not self.running:
+            return
+        self.running = False
+        self.profile.disable()
+        self.path = os.path.join(PROFILE_DIR, f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        self.profile.dump_stats(self.path)
+        logger.info(json.dumps({"run": "profile", "path": self.path}))
+
+    def top(self, limit=25, sort="cumulative"):
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+class Ranking:
+    # Participants ordered by an integer score, highest first and ties by
+    # name, together with a histogram of the scores. Top-k, everyone tied at
+    # the top, everyone at or above a threshold and a participant's rank are
+    # all answered from the order and the histogram instead of scanning the
+    # scores. Rankings are never modified in place, so they can be shared
+    # between sessions.
+
+    def __init__(self, names, scores, _name_order=None):
+        # names must be unique, as in a PointsTable
+        self.names = np.asarray(names, dtype=object)
+        self.scores = np.asarray(scores, dtype=np.int64)
+        if len(self.scores) and self.scores.min() < 0:
+            raise ValueError("Ranking scores can't be negative")
+        self._name_order = np.argsort(self.names, kind="stable") if _name_order is None else _name_order
+        self._counts = np.bincount(self.scores)
+        self._order = None
+        self._at_least = None
+
+    def __len__(self):
+        return len(self.scores)
+
+    def arrays(self):
+        # Every array the ranking holds, for sizing caches
+        return [array for array in (self.names, self.scores, self._name_order, self._counts, self._order,
+                                    self._at_least) if array is not None]
+
+    @property
+    def order(self):
+        # Positions sorted by score, highest first, then by name: a stable
+        # sort of the name order by distance from the top score. Scores are
+        # small, so the key fits in uint8 or uint16, which numpy sorts with a
+        # radix (counting) sort in linear time.
+        if self._order is None:
+            top = len(self._counts) - 1
+            key = top - self.scores[self._name_order]
+            if top < 1 << 16:
+                key = key.astype(np.uint8 if top < 1 << 8 else np.uint16)
+            self._order = self._name_order[np.argsort(key, kind="stable")]
+        return self._order
+
+    def count_at_least(self, score):
+        # Number of participants scoring score or more
+        if self._at_least is None:
+            self._at_least = np.append(np.cumsum(self._counts[::-1])[::-1], 0)
+        return int(self._at_least[min(max(int(score), 0), len(self._counts))])
+
+    def top(self, k):
+        # The k highest scorers (fewer if there are fewer participants) with
+        # their competition rank: tied scores share a rank
+        positions = self.order[:k]
+        scores = self.scores[positions]
+        ranks = [self.count_at_least(score + 1) + 1 for score in scores]
+        return pd.DataFrame({"Rank": ranks, "Name": self.names[positions], "Points": scores})
+
+    def max_score(self):
+        return len(self._counts) - 1 if len(self) else None
+
+    def tied_at_max(self):
+        # Positions of everyone on the highest score
+        return self.order[:self._counts[-1]] if len(self) else self.order
+
+    def at_least(self, threshold):
+        # Positions of everyone scoring threshold or more, highest first
+        return self.order[:self.count_at_least(threshold)]
+
+    def rank(self, name):
+        # Competition rank of a participant (1 is the top; ties share a
+        # rank), or None for an unknown name
+        sorted_names = self.names[self._name_order]
+        index = np.searchsorted(sorted_names, name)
+        if index == len(sorted_names) or sorted_names[index] != name:
+            return None
+        return self.count_at_least(self.scores[self._name_order[index]] + 1) + 1
+
+    def histogram(self):
+        # Number of participants on each score that anyone has, lowest first
+        scores = np.flatnonzero(self._counts)
+        return pd.Series(self._counts[scores], index=pd.Index(scores, name="Points"), name="Participants")
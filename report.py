@@ -0,0 +1,253 @@
+import tempfile
+import zlib
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from scoring import render_results
+
+
+# Reports smaller than this stay in memory, larger ones spill to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Number of detail rows converted to text at a time
+CHUNK_ROWS = 5000
+
+MARGIN = 50
+LINE_HEIGHT = 15
+TABLE_FONT_SIZE = 7
+TABLE_LINE_HEIGHT = 10
+
+FONTS = {"Helvetica": "F1", "Helvetica-Bold": "F2"}
+
+
+def _escape(text):
+    text = str(text).replace("\r", " ").replace("\n", " ")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class StreamingCanvas:
+    # A tiny subset of the reportlab canvas API (setFont, drawString, showPage,
+    # save) that writes each page to the output file as soon as it is
+    # finished. reportlab's canvas keeps every page in memory until save(),
+    # which made large reports grow with the participant count. Only the
+    # standard Helvetica fonts are supported, which is all the report uses.
+
+    def __init__(self, fileobj, pagesize=letter):
+        self._file = fileobj
+        self._width, self._height = pagesize
+        self._position = 0
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 3 + len(FONTS)  # 1 is the catalog, 2 the page tree
+        self._ops = []
+        self._font = None
+        self.setFont("Helvetica", 12)
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for index, name in enumerate(FONTS):
+            self._write_object(3 + index, f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} "
+                                          f"/Encoding /WinAnsiEncoding >>".encode())
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _write_object(self, object_id, body):
+        self._offsets[object_id] = self._position
+        self._write(f"{object_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _allocate(self):
+        self._next_id += 1
+        return self._next_id - 1
+
+    def setFont(self, name, size):
+        self._font = (FONTS[name], size)
+
+    def drawString(self, x, y, text):
+        font, size = self._font
+        self._ops.append(f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET")
+
+    def showPage(self):
+        content = zlib.compress("\n".join(self._ops).encode("cp1252", errors="replace"))
+        content_id, page_id = self._allocate(), self._allocate()
+        self._write_object(content_id, f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode()
+                           + content + b"\nendstream")
+        fonts = " ".join(f"/{alias} {3 + index} 0 R" for index, alias in enumerate(FONTS.values()))
+        self._write_object(page_id, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self._width:.2f} {self._height:.2f}] "
+                                    f"/Resources << /Font << {fonts} >> >> /Contents {content_id} 0 R >>".encode())
+        self._page_ids.append(page_id)
+        self._ops = []
+
+    def save(self):
+        if self._ops or not self._page_ids:
+            self.showPage()
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_position = self._position
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[object_id]:010d} 00000 n \n" for object_id in range(1, self._next_id)]
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_position}\n%%EOF\n")
+        self._write("".join(lines).encode())
+
+
+def _table_layout(columns, width):
+    # Fixed column widths that always fit the page: the name column gets a
+    # double share of the usable width.
+    shares = [2 if column == "Name" else 1 for column in columns]
+    unit = width / sum(shares)
+    positions, x = [], MARGIN
+    for share in shares:
+        positions.append((x, share * unit - 4))
+        x += share * unit
+    return positions
+
+
+def _fit(text, max_width, font="Helvetica", size=TABLE_FONT_SIZE):
+    # No Helvetica glyph is wider than the font size, so short values can skip
+    # measuring.
+    if len(text) * size <= max_width or stringWidth(text, font, size) <= max_width:
+        return text
+    while text and stringWidth(text + "...", font, size) > max_width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _iter_rows(df, chunk_rows=CHUNK_ROWS, render=None):
+    # Convert the frame to text a chunk at a time instead of all at once
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if render is not None:
+            chunk = render(chunk)
+        yield from zip(*(chunk[column].astype(str).tolist() for column in chunk.columns))
+
+
+def create_pdf(filtered_df, correct_summary, top_scorers_dict, lucky_draw_winners, include_details=True):
+    # Returns a file object positioned at the start of the report. Set
+    # include_details to False for only the summary and winners sections.
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    p = StreamingCanvas(buffer, pagesize=letter)
+    width, height = letter
+    y_position = height - 80
+
+    def new_line(step=LINE_HEIGHT):
+        nonlocal y_position
+        y_position -= step
+        if y_position < MARGIN:
+            p.showPage()
+            y_position = height - MARGIN
+
+    # Title
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(MARGIN, height - 50, "Race Guess Analyzer - Detailed Report")
+
+    # Summary Section
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(MARGIN, y_position, "Summary of Participant Performance:")
+    new_line(20)
+
+    p.setFont("Helvetica", 10)
+    summary_columns = ["Name", "Points", "1st Place Correct", "2nd Place Correct", "3rd Place Correct"]
+    for name, points, first, second, third in _iter_rows(correct_summary[summary_columns]):
+        p.drawString(MARGIN, y_position, f"{name}: {points} Points | 1st Place Correct: {first} | "
+                                         f"2nd Place Correct: {second} | 3rd Place Correct: {third}")
+        new_line()
+
+    # Top Scorer Section
+    if top_scorers_dict:
+        new_line()
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(MARGIN, y_position, "Top Performers:")
+        new_line(20)
+        p.setFont("Helvetica", 10)
+        for category, scorers in top_scorers_dict.items():
+            p.drawString(MARGIN, y_position, f"{category}:")
+            new_line()
+            for scorer in scorers:
+                p.drawString(MARGIN + 20, y_position, f"- {scorer}")
+                new_line()
+
+    # Lucky Draw Winners
+    if lucky_draw_winners:
+        new_line()
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(MARGIN, y_position, "Lucky Draw Winners:")
+        new_line(20)
+        p.setFont("Helvetica", 10)
+        for category, winner in lucky_draw_winners.items():
+            p.drawString(MARGIN, y_position, f"{category}: {winner}")
+            new_line()
+
+    # Detailed Results Section
+    if include_details and not filtered_df.empty:
+        new_line()
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(MARGIN, y_position, "Detailed Results:")
+        new_line(20)
+
+        headers = [column.replace(" Place", "").replace("Correct", "OK") for column in filtered_df.columns]
+        layout = _table_layout(headers, width - 2 * MARGIN)
+
+        def draw_headers():
+            p.setFont("Helvetica-Bold", TABLE_FONT_SIZE)
+            for (x, max_width), header in zip(layout, headers):
+                p.drawString(x, y_position, _fit(header, max_width, "Helvetica-Bold"))
+            p.setFont("Helvetica", TABLE_FONT_SIZE)
+
+        draw_headers()
+        for row in _iter_rows(filtered_df, render=render_results):
+            new_line(TABLE_LINE_HEIGHT)
+            if y_position == height - MARGIN:
+                # Repeat the header row at the top of every new page
+                draw_headers()
+                new_line(TABLE_LINE_HEIGHT)
+            for (x, max_width), value in zip(layout, row):
+                p.drawString(x, y_position, _fit(value, max_width))
+
+    p.save()
+    buffer.seek(0)
+    return buffer
+
+
+def create_slips(filtered_df, slots_per_participant):
+    # One page per participant entry with their race by race results and
+    # total, for handing out. filtered_df is a results frame, which holds
+    # slots_per_participant consecutive rows per entry.
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    p = StreamingCanvas(buffer, pagesize=letter)
+    width, height = letter
+    if filtered_df.empty or not slots_per_participant:
+        p.save()
+        buffer.seek(0)
+        return buffer
+
+    headers = [column.replace(" Place", "").replace("Correct", "OK") for column in filtered_df.columns]
+    layout = _table_layout(headers, width - 2 * MARGIN)
+
+    def draw_slip(rows):
+        p.setFont("Helvetica-Bold", 16)
+        p.drawString(MARGIN, height - 50, "Race Guess Analyzer - Participant Slip")
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(MARGIN, height - 80, f"{rows[0][0]}: {sum(int(row[-1]) for row in rows)} Points")
+        y_position = height - 110
+        p.setFont("Helvetica-Bold", TABLE_FONT_SIZE)
+        for (x, max_width), header in zip(layout, headers):
+            p.drawString(x, y_position, _fit(header, max_width, "Helvetica-Bold"))
+        p.setFont("Helvetica", TABLE_FONT_SIZE)
+        for row in rows:
+            y_position -= TABLE_LINE_HEIGHT
+            for (x, max_width), value in zip(layout, row):
+                p.drawString(x, y_position, _fit(value, max_width))
+        p.showPage()
+
+    rows = []
+    for row in _iter_rows(filtered_df, render=render_results):
+        rows.append(row)
+        if len(rows) == slots_per_participant:
+            draw_slip(rows)
+            rows = []
+
+    p.save()
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,165 @@
+"""Scoring rules for a meeting: which races and OPT slots there are, the
+points for each place, partial credit, exotic bets and the prize categories.
+
+Rules are written as a JSON object. Every key is optional and defaults to
+DEFAULT_CONFIG: Races 2-7 at 12/6/2 points, OPT2-OPT7 at 1 point each, no
+partial credit or exotic bets, and the Races 2 & 3, Opt Six and Races 4-7
+prizes. For example, this override adds partial credit and a trifecta bonus
+and replaces the prizes, keeping the default races and points:
+
+    {
+      "wrong_place_points": 1,
+      "exotics": [{"bet": "trifecta", "points": 10}],
+      "prizes": [
+        {"name": "Races 2 & 3", "slots": ["Race 2", "Race 3"], "rule": "at_least", "threshold": 28},
+        {"name": "Races 4-7", "slots": ["Race 4", "Race 5", "Race 6", "Race 7"], "rule": "max"}
+      ]
+    }
+
+place_points gives the points for the 1st, 2nd and 3rd place guesses of a
+race (use 0 for a place that doesn't score). wrong_place_points is partial
+credit for a guessed horse that finished in one of the other places.
+Exotic bets add a bonus to a race when the places are all right: "exacta"
+(1st and 2nd in order), "quinella" (1st and 2nd in either order) or
+"trifecta" (1st, 2nd and 3rd in order). Prize slots are result labels
+("Race 4", "OPT2"); "at_least" awards everyone with at least threshold points
+in those slots, "max" everyone tied on the highest.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+import numpy as np
+
+
+PLACES = ("1st", "2nd", "3rd")
+PRIZE_RULES = ("at_least", "max")
+EXOTIC_BETS = ("exacta", "quinella", "trifecta")
+
+# A prize category: the slots it covers and how winners are picked. "at_least"
+# awards everyone with at least threshold points, "max" everyone tied on the
+# highest points.
+PrizeCategory = namedtuple("PrizeCategory", ["name", "labels", "rule", "threshold", "description"])
+ExoticBet = namedtuple("ExoticBet", ["bet", "points"])
+
+DEFAULT_CONFIG = {
+    "races": [2, 3, 4, 5, 6, 7],
+    "place_points": [12, 6, 2],
+    "wrong_place_points": 0,
+    "opt_races": [2, 3, 4, 5, 6, 7],
+    "opt_points": 1,
+    "exotics": [],
+    "prizes": [
+        {"name": "Races 2 & 3", "slots": ["Race 2", "Race 3"], "rule": "at_least", "threshold": 28,
+         "description": "Participants who scored >=28 points in Races 2 & 3"},
+        {"name": "Opt Six", "slots": ["OPT2", "OPT3", "OPT4", "OPT5", "OPT6", "OPT7"], "rule": "at_least",
+         "threshold": 3, "description": "Participants who scored >=3 points in Opt Six"},
+        {"name": "Races 4-7", "slots": ["Race 4", "Race 5", "Race 6", "Race 7"], "rule": "max",
+         "description": "Participants with the highest points in Races 4-7"},
+    ],
+}
+
+
+def _require(entry, keys, kind):
+    missing = [key for key in keys if key not in entry]
+    if missing:
+        raise ValueError(f"{kind} {entry} is missing {', '.join(missing)}")
+
+
+def _describe(prize):
+    if prize["rule"] == "max":
+        return f"Participants with the highest points in {prize['name']}"
+    return f"Participants who scored >={prize['threshold']} points in {prize['name']}"
+
+
+class ScoringRules:
+    # A rules config checked and compiled once: the answer columns, the slot
+    # labels, the per-slot point weights, the prize categories and the most
+    # points each slot can give. score_slot evaluates a slot for every
+    # participant with the same handful of array operations whatever the
+    # rules say.
+
+    def __init__(self, config=None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown scoring rules keys: {', '.join(sorted(unknown))}")
+        self.config = config
+
+        self.races = tuple(int(race_num) for race_num in config["races"])
+        self.opt_races = tuple(int(opt_num) for opt_num in config["opt_races"])
+        self.place_points = tuple(int(points) for points in config["place_points"])
+        if len(self.place_points) != len(PLACES):
+            raise ValueError(f"place_points needs {len(PLACES)} values, one per place")
+        self.wrong_place_points = int(config["wrong_place_points"])
+        self.opt_points = int(config["opt_points"])
+        self.exotics = []
+        for exotic in config["exotics"]:
+            _require(exotic, ("bet", "points"), "Exotic bet")
+            if exotic.get("bet") not in EXOTIC_BETS:
+                raise ValueError(f"Unknown exotic bet {exotic.get('bet')!r}; use one of {', '.join(EXOTIC_BETS)}")
+            self.exotics.append(ExoticBet(exotic["bet"], int(exotic["points"])))
+        if min(self.place_points + (self.wrong_place_points, self.opt_points), default=0) < 0 or \
+                any(exotic.points < 0 for exotic in self.exotics):
+            raise ValueError("Scoring rules points can't be negative")
+
+        self.race_columns = [f"Race{race_num}_{place}" for race_num in self.races for place in PLACES]
+        self.opt_columns = [f"OPT{opt_num}" for opt_num in self.opt_races]
+        self.guess_columns = self.race_columns + self.opt_columns
+        self.labels = [f"Race {race_num}" for race_num in self.races] + self.opt_columns
+        if not self.labels:
+            raise ValueError("Scoring rules need at least one race or OPT slot")
+
+        self.prize_categories = []
+        for prize in config["prizes"]:
+            _require(prize, ("name", "slots", "rule"), "Prize")
+            if prize.get("rule") not in PRIZE_RULES:
+                raise ValueError(f"Unknown prize rule {prize.get('rule')!r} for {prize.get('name')}")
+            if prize["rule"] == "at_least" and prize.get("threshold") is None:
+                raise ValueError(f"Prize {prize['name']} needs a threshold")
+            unknown = [label for label in prize["slots"] if label not in self.labels]
+            if unknown:
+                raise ValueError(f"Prize {prize['name']} covers unknown slots: {', '.join(unknown)}")
+            self.prize_categories.append(PrizeCategory(prize["name"], tuple(prize["slots"]), prize["rule"],
+                                                       prize.get("threshold"),
+                                                       prize.get("description") or _describe(prize)))
+
+        # Per-participant slot points fit in int8 for the usual formats
+        self.points_dtype = np.int8 if max(map(self.max_slot_points, self.labels), default=0) <= 127 else np.int32
+        self.fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringRules) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def slot_columns(self, label):
+        # (answer columns, points per place) of a slot label
+        if label.startswith("OPT"):
+            return [label], (self.opt_points,)
+        race_num = label.split()[1]
+        return [f"Race{race_num}_{place}" for place in PLACES], self.place_points
+
+    def max_slot_points(self, label):
+        if label.startswith("OPT"):
+            return self.opt_points
+        return (sum(max(points, self.wrong_place_points) for points in self.place_points)
+                + sum(exotic.points for exotic in self.exotics))
+
+    def max_points(self, labels=None):
+        # The most points a participant can score over the given slots (every
+        # slot by default), e.g. for the range of the points gauge
+        return sum(self.max_slot_points(label) for label in (self.labels if labels is None else labels))
+
+
+def load_rules(path=None):
+    # ScoringRules from a JSON file, or the default rules without a path
+    if not path:
+        return DEFAULT_RULES
+    with open(path) as f:
+        return ScoringRules(json.load(f))
+
+
+DEFAULT_RULES = ScoringRules()
@@ -0,0 +1,490 @@
+import json
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from cache import frame_nbytes
+from ranking import Ranking
+from rules import DEFAULT_RULES, PLACES
+
+
+# The default format; pass a ScoringRules (see rules.py) to score another
+RACE_NUMBERS = DEFAULT_RULES.races
+OPT_COLUMNS = DEFAULT_RULES.opt_columns
+GUESS_COLUMNS = DEFAULT_RULES.guess_columns
+
+RESULT_COLUMNS = [
+    "Name", "Race",
+    "1st Place Guess", "1st Place Actual", "1st Place Correct",
+    "2nd Place Guess", "2nd Place Actual", "2nd Place Correct",
+    "3rd Place Guess", "3rd Place Actual", "3rd Place Correct",
+    "Points",
+]
+
+
+# Guess values that mean "no guess". They are stored as the missing code -1
+# and never score, even against a place whose answer has not been entered.
+NO_GUESS_VALUES = {"", "0", "nan"}
+
+
+# Columns read as text, so pandas never turns horse numbers into floats
+# ("5" into "5.0") or blanks into NaN
+def guesses_dtypes(rules=DEFAULT_RULES):
+    return dict.fromkeys(["Name"] + rules.guess_columns, str)
+
+
+def normalize_value(value):
+    # Canonical form of a guess or answer: stripped, with horse numbers
+    # written as plain integers, so "05", "5.0" and " 5" all match "5"
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+
+def normalize_guesses(guesses_df, rules=DEFAULT_RULES):
+    # Every guess column becomes a categorical over one category list shared by
+    # all guess columns, so guesses are stored as small integer codes. Blank and
+    # "0" guesses, and missing columns, get the missing code. Only the distinct
+    # values of each column go through normalize_value. Names become a
+    # categorical too, since they repeat once per race in the results. Names
+    # are stripped, and blank or whitespace-only names count as missing.
+    count = len(guesses_df)
+    factorized = {}
+    for column in rules.guess_columns:
+        if column in guesses_df.columns:
+            codes, uniques = pd.factorize(guesses_df[column], use_na_sentinel=True)
+            labels = [normalize_value(value) for value in uniques]
+            factorized[column] = (codes, labels)
+
+    categories = sorted(set().union(*(labels for _, labels in factorized.values())) - NO_GUESS_VALUES)
+    lookup = {label: code for code, label in enumerate(categories)}
+
+    names = pd.Categorical(guesses_df["Name"].str.strip())
+    if "" in names.categories:
+        names = names.remove_categories([""])
+    normalized = {"Name": names}
+    for column in rules.guess_columns:
+        if column in factorized:
+            codes, labels = factorized[column]
+            # The trailing entry maps factorize's missing code -1 to NO_GUESS
+            remap = np.array([lookup.get(label, -1) for label in labels] + [-1], dtype=np.int32)
+            codes = remap[codes]
+        else:
+            codes = np.full(count, -1, dtype=np.int32)
+        normalized[column] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(normalized, columns=["Name"] + rules.guess_columns)
+
+
+def guess_categories(normalized_df):
+    # Shared by every guess column; the first column after Name stands for all
+    return list(normalized_df.iloc[:, 1].cat.categories)
+
+
+def active_slots(correct_answers, rules=DEFAULT_RULES):
+    # (label, answers) for every race or OPT slot that has a result entered,
+    # in the order the slots appear in the results frame.
+    slots = []
+    for race_num in rules.races:
+        answers = tuple(normalize_value(correct_answers.get(f"Race{race_num}_{place}", "0")) for place in PLACES)
+        if any(value != "0" for value in answers):
+            slots.append((f"Race {race_num}", answers))
+    for opt_num in rules.opt_races:
+        answer = normalize_value(correct_answers.get(f"OPT{opt_num}", "0"))
+        if answer != "0":
+            slots.append((f"OPT{opt_num}", (answer,)))
+    return slots
+
+
+def score_slot(normalized_df, label, answers, rules=DEFAULT_RULES):
+    # Score one race or OPT slot for every participant. The block holds the
+    # guess codes, the answer labels and the correct flags per place, and the
+    # slot's points. OPT slots only use the 1st place; the 2nd and 3rd are
+    # None. Points include the rules' partial credit and exotic bet bonuses;
+    # the correct flags are for exact places only.
+    count = len(normalized_df)
+    columns, weights = rules.slot_columns(label)
+
+    lookup = {category: code for code, category in enumerate(guess_categories(normalized_df))}
+    block = {}
+    points = np.zeros(count, dtype=rules.points_dtype)
+    guessed, wanted, correct = [], [], []
+    for index, place in enumerate(PLACES):
+        if index < len(columns):
+            codes = normalized_df[columns[index]].cat.codes.to_numpy()
+            actual = None if answers[index] in NO_GUESS_VALUES else answers[index]
+            # An answer nobody guessed has no category and matches nothing
+            guessed.append(codes)
+            wanted.append(lookup.get(actual, -2))
+            correct.append(codes == wanted[-1])
+            points += correct[-1] * points.dtype.type(weights[index])
+            block[f"{place} Place Guess"] = codes
+            block[f"{place} Place Actual"] = actual
+            block[f"{place} Place Correct"] = correct[-1]
+        else:
+            block[f"{place} Place Guess"] = None
+            block[f"{place} Place Actual"] = None
+            block[f"{place} Place Correct"] = np.zeros(count, dtype=bool)
+
+    if len(columns) == len(PLACES):
+        if rules.wrong_place_points:
+            # A guessed horse that finished in one of the other places
+            for index, codes in enumerate(guessed):
+                elsewhere = [code for other, code in enumerate(wanted) if other != index and code >= 0]
+                wrong_place = np.isin(codes, elsewhere) & ~correct[index]
+                points += wrong_place * points.dtype.type(rules.wrong_place_points)
+        for exotic in rules.exotics:
+            if exotic.bet == "exacta":
+                hit = correct[0] & correct[1]
+            elif exotic.bet == "trifecta":
+                hit = correct[0] & correct[1] & correct[2]
+            else:
+                hit = (correct[0] & correct[1]) | ((guessed[0] == wanted[1]) & (guessed[1] == wanted[0]))
+            points += hit * points.dtype.type(exotic.points)
+    block["Points"] = points
+    return block
+
+
+def assemble_results(normalized_df, scored_slots):
+    # Build the long-format results frame from (label, block) pairs, in the
+    # participant-major order of the original loop: every slot for the first
+    # participant, then every slot for the second, and so on. Names, races,
+    # guesses and answers are categoricals, points are int8; use
+    # render_results for display strings.
+    count = len(normalized_df)
+    if not scored_slots or count == 0:
+        return pd.DataFrame()
+    labels = [label for label, _ in scored_slots]
+    blocks = [block for _, block in scored_slots]
+    slots = len(blocks)
+
+    # Answers nobody guessed are appended to the guess categories, which keeps
+    # the guess codes valid.
+    categories = guess_categories(normalized_df)
+    for block in blocks:
+        for place in PLACES:
+            actual = block[f"{place} Place Actual"]
+            if actual is not None and actual not in categories:
+                categories.append(actual)
+    lookup = {category: code for code, category in enumerate(categories)}
+
+    def interleave(arrays):
+        return np.stack(arrays, axis=1).ravel()
+
+    names = normalized_df["Name"].cat
+    results = {
+        "Name": pd.Categorical.from_codes(np.repeat(names.codes.to_numpy(), slots), categories=names.categories),
+        "Race": pd.Categorical.from_codes(np.tile(np.arange(slots), count), categories=labels),
+    }
+    missing = np.full(count, -1, dtype=np.int8)
+    for place in PLACES:
+        guesses = [block[f"{place} Place Guess"] for block in blocks]
+        actuals = [lookup.get(block[f"{place} Place Actual"], -1) for block in blocks]
+        results[f"{place} Place Guess"] = pd.Categorical.from_codes(
+            interleave([missing if codes is None else codes for codes in guesses]), categories=categories)
+        results[f"{place} Place Actual"] = pd.Categorical.from_codes(
+            np.tile(np.array(actuals), count), categories=categories)
+        results[f"{place} Place Correct"] = interleave([block[f"{place} Place Correct"] for block in blocks])
+    results["Points"] = interleave([block["Points"] for block in blocks])
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def concat_results(frames):
+    # Concatenate results frames while keeping their categorical columns
+    # categorical (pd.concat falls back to object when categories differ).
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in RESULT_COLUMNS:
+        values = [frame[column] for frame in frames]
+        if isinstance(values[0].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals(values, ignore_order=True)
+        else:
+            columns[column] = np.concatenate([value.to_numpy() for value in values])
+    return pd.DataFrame(columns, columns=RESULT_COLUMNS)
+
+
+def render_results(results_df):
+    # Display strings for a results frame: missing guesses and answers show as
+    # "0", and the unused 2nd and 3rd place columns of OPT rows stay empty.
+    if results_df.empty:
+        return results_df
+    is_opt = results_df["Race"].astype(str).str.startswith("OPT").to_numpy()
+    rendered = {"Name": results_df["Name"].to_numpy(dtype=object), "Race": results_df["Race"].to_numpy(dtype=object)}
+    for place in PLACES:
+        for kind in ("Guess", "Actual"):
+            column = results_df[f"{place} Place {kind}"].cat
+            labels = np.append(column.categories.to_numpy(dtype=object), "0")
+            values = labels[column.codes.to_numpy()]
+            if place != "1st":
+                values[is_opt] = ""
+            rendered[f"{place} Place {kind}"] = values
+        rendered[f"{place} Place Correct"] = results_df[f"{place} Place Correct"].to_numpy()
+    rendered["Points"] = results_df["Points"].to_numpy(dtype=np.int64)
+    return pd.DataFrame(rendered, index=results_df.index, columns=RESULT_COLUMNS)
+
+
+def score_guesses(normalized_df, correct_answers, rules=DEFAULT_RULES):
+    scored_slots = [(label, score_slot(normalized_df, label, answers, rules))
+                    for label, answers in active_slots(correct_answers, rules)]
+    return assemble_results(normalized_df, scored_slots)
+
+
+SUMMARY_COLUMNS = ["1st Place Correct", "2nd Place Correct", "3rd Place Correct", "Points"]
+
+
+PRIZE_CATEGORIES = DEFAULT_RULES.prize_categories
+
+
+class PointsTable:
+    # One row per participant with the summary columns plus the points scored
+    # in every active slot (one column per slot label). Tables for different
+    # parts of the same event can be merged by summing per name.
+
+    def __init__(self, frame, labels):
+        self.frame = frame
+        self.labels = list(labels)
+        self._ranked = None
+        # column -> Ranking
+        self._rankings = {}
+        self._names = None
+        self._name_order = None
+
+    @classmethod
+    def merge(cls, tables):
+        tables = list(tables)
+        labels = tables[0].labels
+        frame = pd.concat([table.frame for table in tables], ignore_index=True)
+        return cls(frame.groupby("Name")[SUMMARY_COLUMNS + labels].sum().reset_index(), labels)
+
+    def summary(self):
+        return self.frame[["Name"] + SUMMARY_COLUMNS]
+
+    def nbytes(self):
+        # Memory held by the table, its rankings and its ranked summary.
+        # Arrays shared between rankings (names, name order) count once.
+        arrays = {id(array): array for ranking in self._rankings.values() for array in ranking.arrays()}
+        total = frame_nbytes(self.frame) + sum(array.nbytes for array in arrays.values())
+        if self._ranked is not None:
+            total += frame_nbytes(self._ranked)
+        return total
+
+    def ranked_summary(self):
+        # The summary sorted by points, highest first, then by name. Sorted
+        # once per table so paging through it is just slicing.
+        if self._ranked is None:
+            self._ranked = self.summary().iloc[self.ranking().order].reset_index(drop=True)
+        return self._ranked
+
+    def ranking(self, category=None):
+        # Ranking of the participants by total points, or by their points in
+        # a prize category
+        column = "Points" if category is None else category.name
+        if column not in self._rankings:
+            if category is None:
+                points = self.frame["Points"].to_numpy()
+            else:
+                points = sum((self.frame[label].to_numpy() for label in self.labels if label in category.labels),
+                             np.zeros(len(self.frame), dtype=np.int64))
+            if self._names is None:
+                # Shared by every ranking of the table
+                self._names = self.frame["Name"].to_numpy(dtype=object)
+                self._name_order = np.argsort(self._names, kind="stable")
+            self._rankings[column] = Ranking(self._names, points, _name_order=self._name_order)
+        return self._rankings[column]
+
+
+class IncrementalScorer:
+    # Keeps the scored block of every active slot together with the answers it
+    # was scored against. When the answers change only the slots whose answers
+    # differ are rescored; everything else is reassembled from the cache. The
+    # per-participant sums of every slot are kept the same way.
+
+    def __init__(self, normalized_df, rules=DEFAULT_RULES):
+        self.normalized_df = normalized_df
+        self.rules = rules
+        self._slots = None
+        self._blocks = {}
+        self._results = None
+        self._table = None
+        self._groups = None
+        self._grouped = {}
+        self._accuracy = None
+
+    def copy(self):
+        # A scorer with the same state that can be updated without touching
+        # this one, e.g. when this one is shared between sessions
+        scorer = IncrementalScorer(self.normalized_df, self.rules)
+        scorer.__dict__.update(self.__dict__)
+        scorer._blocks = dict(self._blocks)
+        return scorer
+
+    def update(self, correct_answers):
+        slots = active_slots(correct_answers, self.rules)
+        if slots == self._slots:
+            return False
+        blocks = {}
+        for label, answers in slots:
+            cached = self._blocks.get(label)
+            if cached is None or cached[0] != answers:
+                cached = (answers, score_slot(self.normalized_df, label, answers, self.rules))
+            blocks[label] = cached
+        self._slots = slots
+        self._blocks = blocks
+        self._results = None
+        self._table = None
+        self._accuracy = None
+        return True
+
+    @property
+    def labels(self):
+        return [label for label, _ in self._slots or []]
+
+    @property
+    def blocks(self):
+        # {label: (answers, block)} for every slot scored so far
+        return dict(self._blocks)
+
+    def seed(self, blocks):
+        # Add blocks scored earlier (e.g. loaded from a ResultsStore) so that
+        # update() reuses them instead of rescoring those slots
+        self._blocks.update(blocks)
+
+    @property
+    def results(self):
+        if self._results is None:
+            self._results = assemble_results(self.normalized_df,
+                                             [(label, self._blocks[label][1]) for label in self.labels])
+        return self._results
+
+    def _group_rows(self):
+        # (rows with a name, their participant number, participant names in
+        # sorted order), the same grouping as groupby("Name")
+        if self._groups is None:
+            names = self.normalized_df["Name"].cat
+            codes = names.codes.to_numpy()
+            named = codes >= 0
+            used, inverse = np.unique(codes[named], return_inverse=True)
+            group_names = names.categories.to_numpy(dtype=object)[used]
+            order = np.argsort(group_names, kind="stable")
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            self._groups = (named, position[inverse], group_names[order])
+        return self._groups
+
+    def points_table(self):
+        # Per-participant sums of every slot, kept per slot so a rebuild only
+        # regroups the slots whose answers changed.
+        if self._table is None:
+            named, groups, names = self._group_rows()
+            grouped = {}
+            for label in self.labels:
+                answers, block = self._blocks[label]
+                cached = self._grouped.get(label)
+                if cached is None or cached[0] != answers:
+                    cached = (answers, {column: np.bincount(groups, weights=block[column][named],
+                                                            minlength=len(names)).astype(np.int64)
+                                        for column in SUMMARY_COLUMNS})
+                grouped[label] = cached
+
+            frame = {"Name": names}
+            for column in SUMMARY_COLUMNS:
+                frame[column] = sum((grouped[label][1][column] for label in self.labels),
+                                    np.zeros(len(names), dtype=np.int64))
+            for label in self.labels:
+                frame[label] = grouped[label][1]["Points"]
+            self._table = PointsTable(pd.DataFrame(frame, columns=["Name"] + SUMMARY_COLUMNS + self.labels),
+                                      self.labels)
+            self._grouped = grouped
+        return self._table
+
+    def summary(self):
+        return self.points_table().summary()
+
+    def nbytes(self):
+        # Memory held by the scored state, for sizing caches: the slot blocks,
+        # the grouping and per-slot sums, the results, the points table with
+        # its rankings and the accuracy table. The guesses frame is shared
+        # with the guesses cache and not counted.
+        arrays = [value for _, block in self._blocks.values() for value in block.values() if hasattr(value, "nbytes")]
+        arrays += [array for _, sums in self._grouped.values() for array in sums.values()]
+        arrays += list(self._groups or ())
+        total = sum(array.nbytes for array in arrays)
+        for frame in (self._results, self._accuracy):
+            if frame is not None:
+                total += frame_nbytes(frame)
+        if self._table is not None:
+            total += self._table.nbytes()
+        return total
+
+    def slot_accuracy(self):
+        # Share of participants with each place right, per active slot, read
+        # from the per-slot blocks. OPT slots only have a 1st place.
+        if self._accuracy is None:
+            accuracy = {place: [] for place in PLACES}
+            for label in self.labels:
+                block = self._blocks[label][1]
+                for place in PLACES:
+                    unused = block[f"{place} Place Actual"] is None or not len(self.normalized_df)
+                    accuracy[place].append(np.nan if unused else block[f"{place} Place Correct"].mean())
+            self._accuracy = pd.DataFrame(accuracy, index=pd.Index(self.labels, name="Race"))
+        return self._accuracy
+
+
+def find_top_performers(table, excluded_names=(), categories=None):
+    # Prize winners per category from a PointsTable, read off each category's
+    # ranking, in name order. Categories with no slot results entered are
+    # skipped. Names in excluded_names (earlier lucky draw winners) are left
+    # out of every category.
+    categories = PRIZE_CATEGORIES if categories is None else categories
+    excluded_names = set(excluded_names)
+    top_scorers = {}
+    for category in categories:
+        if not any(label in category.labels for label in table.labels):
+            continue
+        ranking = table.ranking(category)
+        if category.rule == "at_least":
+            winners = ranking.at_least(category.threshold)
+        elif category.rule == "max":
+            winners = ranking.tied_at_max()
+        else:
+            raise ValueError(f"Unknown prize rule {category.rule!r} for {category.name}")
+        names = [name for name in ranking.names[np.sort(winners)] if name not in excluded_names]
+        if names:
+            top_scorers[category.name] = names
+    return top_scorers
+
+
+def analyze_guesses(guesses_df, correct_answers, rules=DEFAULT_RULES):
+    return score_guesses(normalize_guesses(guesses_df, rules), correct_answers, rules)
+
+
+def read_guesses_csv(source, rules=DEFAULT_RULES, **kwargs):
+    # The raw guesses table, with the guess columns read as text
+    return pd.read_csv(source, dtype=guesses_dtypes(rules), keep_default_na=False, **kwargs)
+
+
+def read_guesses(source, rules=DEFAULT_RULES):
+    return normalize_guesses(read_guesses_csv(source, rules), rules)
+
+
+def read_answers(path, rules=DEFAULT_RULES):
+    # Correct answers from a JSON object ({"Race2_1st": "5", ...}), or a CSV
+    # with either the answer columns as headers and one row of values, or a
+    # header row followed by column,value pairs.
+    if str(path).lower().endswith(".json"):
+        with open(path) as f:
+            answers = json.load(f)
+    else:
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if set(frame.columns) & set(rules.guess_columns):
+            answers = frame.iloc[0].to_dict() if len(frame) else {}
+        else:
+            answers = dict(zip(frame.iloc[:, 0], frame.iloc[:, 1]))
+    return {column: str(value) for column, value in answers.items()}
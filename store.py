@@ -0,0 +1,147 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+# Location of the results store; set RACE_STORE to keep it elsewhere
+STORE_PATH = os.environ.get("RACE_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "race_store.sqlite3"))
+# Bump when normalize_guesses, score_slot or the guesses report change what
+# they produce, or the schema changes, so data saved by an older version is dropped, not reused
+STORE_VERSION = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    file_hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guesses (
+    file_hash TEXT PRIMARY KEY REFERENCES events (file_hash),
+    rules TEXT NOT NULL,
+    frame BLOB NOT NULL,
+    report BLOB
+);
+CREATE TABLE IF NOT EXISTS answers (
+    file_hash TEXT PRIMARY KEY REFERENCES events (file_hash),
+    answers TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slot_blocks (
+    file_hash TEXT NOT NULL REFERENCES events (file_hash),
+    label TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    rules TEXT NOT NULL,
+    block BLOB NOT NULL,
+    PRIMARY KEY (file_hash, label, answers, rules)
+);
+CREATE TABLE IF NOT EXISTS lucky_draws (
+    file_hash TEXT NOT NULL REFERENCES events (file_hash),
+    category TEXT NOT NULL,
+    winner TEXT NOT NULL,
+    drawn_at REAL NOT NULL,
+    PRIMARY KEY (file_hash, category)
+);
+"""
+TABLES = ("slot_blocks", "lucky_draws", "answers", "guesses", "events")
+
+
+def _dumps(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class ResultsStore:
+    # SQLite store of everything an event needs to come back after a restart
+    # or in a new browser tab: the parsed guesses, the last answers entered,
+    # the scored block of every slot and the lucky draw winners, all keyed by
+    # the guesses file hash. Guesses and blocks are saved per scoring rules
+    # fingerprint, since the rules decide which columns are read and how
+    # slots score. Frames and blocks are pickled, so only point it
+    # at a file this app writes. One connection is shared by every session,
+    # serialized with a lock.
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._db.executescript(SCHEMA)
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or int(row[0]) != STORE_VERSION:
+                # Tables are recreated in case their columns changed too
+                for table in TABLES:
+                    self._db.execute(f"DROP TABLE {table}")
+                self._db.executescript(SCHEMA)
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(STORE_VERSION),))
+
+    def close(self):
+        self._db.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def save_event(self, file_hash, name):
+        self._execute("INSERT OR IGNORE INTO events VALUES (?, ?, ?)", (file_hash, name, time.time()))
+
+    def events(self):
+        # (file_hash, name, created_at) for every stored event, newest first
+        return self._execute("SELECT file_hash, name, created_at FROM events ORDER BY created_at DESC")
+
+    def load_guesses(self, file_hash, rules):
+        # (normalized frame, validation report), or None if never saved under
+        # these rules
+        rows = self._execute("SELECT frame, report FROM guesses WHERE file_hash = ? AND rules = ?", (file_hash, rules))
+        if not rows:
+            return None
+        frame, report = rows[0]
+        return pickle.loads(frame), None if report is None else pickle.loads(report)
+
+    def save_guesses(self, file_hash, rules, guesses_df, report=None):
+        self._execute("INSERT OR REPLACE INTO guesses VALUES (?, ?, ?, ?)",
+                      (file_hash, rules, _dumps(guesses_df), None if report is None else _dumps(report)))
+
+    def load_answers(self, file_hash):
+        rows = self._execute("SELECT answers FROM answers WHERE file_hash = ?", (file_hash,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_answers(self, file_hash, correct_answers):
+        self._execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                      (file_hash, json.dumps(correct_answers, sort_keys=True), time.time()))
+
+    def load_blocks(self, file_hash, rules, slots):
+        # {label: (answers, block)} for the (label, answers) slots already
+        # scored for this file under these rules; slots that were never
+        # scored are left out
+        blocks = {}
+        for label, answers in slots:
+            rows = self._execute("SELECT block FROM slot_blocks WHERE file_hash = ? AND label = ? AND answers = ? "
+                                 "AND rules = ?", (file_hash, label, json.dumps(answers), rules))
+            if rows:
+                blocks[label] = (answers, pickle.loads(rows[0][0]))
+        return blocks
+
+    def save_blocks(self, file_hash, rules, blocks):
+        rows = [(file_hash, label, json.dumps(answers), rules, _dumps(block))
+                for label, (answers, block) in blocks.items()]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR IGNORE INTO slot_blocks VALUES (?, ?, ?, ?, ?)", rows)
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def load_lucky_draws(self, file_hash):
+        # {category: winner} in the order the draws were made
+        return dict(self._execute("SELECT category, winner FROM lucky_draws WHERE file_hash = ? ORDER BY drawn_at",
+                                  (file_hash,)))
+
+    def save_lucky_draw(self, file_hash, category, winner):
+        self._execute("INSERT OR REPLACE INTO lucky_draws VALUES (?, ?, ?, ?)",
+                      (file_hash, category, winner, time.time()))
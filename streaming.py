@@ -0,0 +1,84 @@
+import pandas as pd
+
+from rules import DEFAULT_RULES
+from scoring import (SUMMARY_COLUMNS, IncrementalScorer, PointsTable, active_slots, normalize_guesses, read_guesses_csv,
+                     render_results)
+
+
+# Rows read, scored and written per chunk
+CHUNK_ROWS = 100_000
+# Per-chunk totals are folded together once this many have accumulated
+MERGE_EVERY = 8
+
+
+class ParquetDetailWriter:
+    # Appends each chunk's results to one Parquet file as a row group.
+    # Categorical columns are written as dictionaries with 32-bit indices so
+    # every chunk shares the schema of the first, whatever its categories.
+
+    def __init__(self, path):
+        import pyarrow  # noqa: F401  (fail early if the optional dependency is missing)
+
+        self.path = path
+        self._writer = None
+        self._schema = None
+
+    def write(self, results_df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(results_df, preserve_index=False)
+        if self._writer is None:
+            self._schema = pa.schema([
+                pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_csv_in_chunks(source, correct_answers, chunk_rows=CHUNK_ROWS, detail_csv=None, detail_parquet=None,
+                        progress=None, rules=DEFAULT_RULES):
+    # Score a guesses CSV without ever holding all of it in memory. Each chunk
+    # is scored on its own, its long-format results are appended to the
+    # detail files (if any) and dropped, and its per-participant totals are
+    # folded into the running totals. progress(rows_done) is called after every
+    # chunk. Returns the merged PointsTable and the number of rows read.
+    labels = [label for label, _ in active_slots(correct_answers, rules)]
+    tables = []
+    rows = 0
+    csv_header = True
+    parquet_writer = ParquetDetailWriter(detail_parquet) if detail_parquet else None
+    try:
+        for chunk in read_guesses_csv(source, rules, chunksize=chunk_rows):
+            scorer = IncrementalScorer(normalize_guesses(chunk.reset_index(drop=True), rules), rules)
+            scorer.update(correct_answers)
+            results = scorer.results
+            if not results.empty:
+                if detail_csv:
+                    render_results(results).to_csv(detail_csv, mode="w" if csv_header else "a",
+                                                   header=csv_header, index=False)
+                    csv_header = False
+                if parquet_writer:
+                    parquet_writer.write(results)
+
+            tables.append(scorer.points_table())
+            if len(tables) >= MERGE_EVERY:
+                tables = [PointsTable.merge(tables)]
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+    finally:
+        if parquet_writer:
+            parquet_writer.close()
+
+    if not tables:
+        empty = pd.DataFrame({column: pd.Series(dtype="int64") for column in SUMMARY_COLUMNS + labels})
+        empty.insert(0, "Name", pd.Series(dtype=object))
+        return PointsTable(empty, labels), rows
+    return (tables[0] if len(tables) == 1 else PointsTable.merge(tables)), rows
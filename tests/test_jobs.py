@@ -0,0 +1,68 @@
+import threading
+
+from jobs import JobQueue
+
+
+def test_concurrent_submits_share_one_build():
+    # Several sessions asking for the same slow build at once get the same
+    # job, and the build runs once
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def build(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value
+
+    jobs = JobQueue(workers=2, max_bytes=1024)
+    first = jobs.submit("report", build, b"pdf")
+    assert started.wait(5)
+    # Daemon threads, so a deadlock fails the test instead of hanging it
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(jobs.submit("report", build, b"pdf")), daemon=True)
+               for _ in range(4)]
+    threads.append(threading.Thread(target=lambda: results.append(jobs.job("report")), daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == len(threads)
+    assert all(job is first for job in results)
+
+    release.set()
+    assert first.result(timeout=5) == b"pdf"
+    assert jobs.submit("report", build, b"pdf").result(timeout=5) == b"pdf"
+    assert calls == [b"pdf"]
+
+
+def test_failed_build_is_retried():
+    attempts = []
+
+    def build():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise RuntimeError("first attempt fails")
+        return b"pdf"
+
+    jobs = JobQueue(workers=1, max_bytes=1024)
+    failed = jobs.submit("report", build)
+    assert isinstance(failed.exception(timeout=5), RuntimeError)
+    assert jobs.submit("report", build).result(timeout=5) == b"pdf"
+    assert jobs.job("report").result() == b"pdf"
+
+
+def test_finished_builds_are_not_kept():
+    # A failure or bytes too large for the cache only reach the submitter
+    def fail():
+        raise RuntimeError("build fails")
+
+    jobs = JobQueue(workers=1, max_bytes=4)
+    failed = jobs.submit("report", fail)
+    assert isinstance(failed.exception(timeout=5), RuntimeError)
+    assert jobs.job("report") is None
+
+    oversized = jobs.submit("slips", bytes, 16)
+    assert oversized.result(timeout=5) == bytes(16)
+    assert jobs.job("slips") is None
+    assert "slips" not in jobs.artifacts
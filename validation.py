@@ -0,0 +1,130 @@
+import csv
+import io
+import re
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from rules import DEFAULT_RULES
+from scoring import NO_GUESS_VALUES, normalize_guesses, normalize_value, read_guesses_csv
+
+
+# What was wrong with a guesses file. Problems are located by their line in
+# the file, counting the header as line 1; a row split over several lines by
+# a quoted line break is at the line it starts on. None of these stop the file from being scored: skipped lines are
+# left out, the missing fields of short lines and missing columns count as no
+# guess, blank names as no name, and invalid guesses simply never match an
+# answer.
+GuessesReport = namedtuple("GuessesReport", [
+    "rows",              # data rows read
+    "bad_lines",         # [(line number, reason)] skipped for having too many fields
+    "short_lines",       # [(line number, reason)] kept, with the fields they lack as no guess
+    "missing_columns",   # guess columns not in the file
+    "blank_names",       # [line number] of rows with no name
+    "invalid_guesses",   # DataFrame of Line, Name, Column, Value for guesses that aren't horse numbers
+    "duplicate_names",   # DataFrame of Name, Entries for names on more than one row
+])
+
+BAD_LINE_PATTERN = re.compile(r"line (\d+): (.+)")
+
+
+def is_horse_number(value):
+    return value.isdigit() and int(value) > 0
+
+
+def _scan_lines(source):
+    # pandas pads rows with fewer fields than the header with blanks, which
+    # can't be told apart from blank guesses afterwards, and doesn't say
+    # which line a row came from, so the raw CSV is read a second time.
+    # Returns the short lines and the line number of every row pandas keeps:
+    # like pandas, it skips blank lines and lines with too many fields.
+    if hasattr(source, "read"):
+        position = source.tell()
+        source.seek(0)
+        data = source.read()
+        source.seek(position)
+        text = io.StringIO(data.decode("utf-8-sig") if isinstance(data, bytes) else data, newline="")
+    else:
+        text = open(source, encoding="utf-8-sig", newline="")
+    with text:
+        reader = csv.reader(text)
+        fields = len(next(reader, []))
+        short_lines, lines = [], []
+        start = reader.line_num + 1
+        for row in reader:
+            blank = not row or (len(row) == 1 and row[0] and not row[0].strip())
+            if not blank and len(row) <= fields:
+                lines.append(start)
+                if len(row) < fields:
+                    short_lines.append((start, f"expected {fields} fields, saw {len(row)}"))
+            start = reader.line_num + 1
+        return short_lines, np.asarray(lines, dtype=np.int64)
+
+
+def _invalid_guesses(raw_df, columns, lines):
+    # Checked on the distinct values of each column, then mapped back to the
+    # rows' lines
+    records = []
+    for column in columns:
+        if column not in raw_df.columns:
+            continue
+        codes, uniques = pd.factorize(raw_df[column], use_na_sentinel=True)
+        invalid = [code for code, value in enumerate(uniques)
+                   if (label := normalize_value(value)) not in NO_GUESS_VALUES and not is_horse_number(label)]
+        if invalid:
+            rows = np.flatnonzero(np.isin(codes, invalid))
+            records.append(pd.DataFrame({"Line": lines[rows], "Name": raw_df["Name"].to_numpy(dtype=object)[rows],
+                                         "Column": column, "Value": np.asarray(uniques, dtype=object)[codes[rows]]}))
+    if not records:
+        return pd.DataFrame(columns=["Line", "Name", "Column", "Value"])
+    return pd.concat(records, ignore_index=True).sort_values(["Line", "Column"], kind="stable", ignore_index=True)
+
+
+def validate_guesses(source, rules=DEFAULT_RULES):
+    # Read, check and normalize a guesses CSV in one pass. Returns the
+    # normalized frame for scoring and a GuessesReport. Raises ValueError if
+    # the file has no Name column.
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        raw_df = read_guesses_csv(source, rules, on_bad_lines="warn")
+    bad_lines = [(int(line), reason.strip()) for warning in caught
+                 for line, reason in BAD_LINE_PATTERN.findall(str(warning.message))]
+    short_lines, lines = _scan_lines(source)
+    if "Name" not in raw_df.columns:
+        raise ValueError("The guesses file has no Name column")
+
+    names = raw_df["Name"].str.strip()
+    blank = (names == "").to_numpy()
+    counts = names[~blank].value_counts()
+    duplicates = counts[counts > 1]
+    report = GuessesReport(
+        rows=len(raw_df),
+        bad_lines=bad_lines,
+        short_lines=short_lines,
+        missing_columns=[column for column in rules.guess_columns if column not in raw_df.columns],
+        blank_names=lines[blank].tolist(),
+        invalid_guesses=_invalid_guesses(raw_df, rules.guess_columns, lines),
+        duplicate_names=pd.DataFrame({"Name": duplicates.index.to_numpy(dtype=object),
+                                      "Entries": duplicates.to_numpy()}),
+    )
+    return normalize_guesses(raw_df, rules), report
+
+
+def report_messages(report):
+    # One line per kind of problem, for showing above the results
+    messages = []
+    if report.bad_lines:
+        messages.append(f"{len(report.bad_lines)} lines had too many fields and were skipped")
+    if report.short_lines:
+        messages.append(f"{len(report.short_lines)} lines had too few fields; the missing guesses count as no guess")
+    if report.missing_columns:
+        messages.append(f"Missing columns, scored as no guess: {', '.join(report.missing_columns)}")
+    if report.blank_names:
+        messages.append(f"{len(report.blank_names)} lines have no name")
+    if len(report.invalid_guesses):
+        messages.append(f"{len(report.invalid_guesses)} guesses aren't horse numbers and can't score")
+    if len(report.duplicate_names):
+        messages.append(f"{len(report.duplicate_names)} names appear on more than one row")
+    return messages